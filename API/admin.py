@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
 from .models import (
     Association,
@@ -6,6 +7,9 @@ from .models import (
     Household,
     HouseholdMember,
     Invoice,
+    InvoiceGroup,
+    LedgerEntry,
+    ReceivablesAgingSnapshot,
     Event,
     EventAttendance,
     Project,
@@ -29,6 +33,11 @@ class FinancialTransactionAdmin(admin.ModelAdmin):
         }),
     )
 
+    def delete_queryset(self, request, queryset):
+        # Delete one by one so each deletion posts its reversal to the ledger
+        for transaction in queryset:
+            transaction.delete()
+
 
 @admin.register(FinancialSummary)
 class FinancialSummaryAdmin(admin.ModelAdmin):
@@ -116,13 +125,56 @@ class InvoiceAdmin(admin.ModelAdmin):
 
     overdue_status.short_description = "Overdue Status"
 
+    def delete_queryset(self, request, queryset):
+        # Take the invoices out of their group counters, then delete them at once
+        with transaction.atomic():
+            Invoice.detach(queryset)
+            queryset.delete()
+
     def mark_as_paid(self, request, queryset):
-        queryset.update(is_paid=True)
+        # Settle through the model so the penalty and balance are recorded too
+        Invoice.settle(queryset, accepted_by=request.user.get_full_name())
         self.message_user(
             request, "Selected invoices have been marked as paid.")
     mark_as_paid.short_description = "Mark selected invoices as Paid"
 
 
+@admin.register(InvoiceGroup)
+class InvoiceGroupAdmin(admin.ModelAdmin):
+    list_display = ('code', 'description', 'association', 'due_date',
+                    'invoice_count', 'paid_count', 'total_billed', 'total_collected')
+    list_filter = ('association', 'due_date')
+    search_fields = ('code', 'description')
+    readonly_fields = ('invoice_count', 'paid_count',
+                       'total_billed', 'total_collected')
+    ordering = ('-created_at',)
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('occurred_at', 'association', 'kind', 'amount',
+                    'description', 'invoice_id', 'financial_transaction_id')
+    list_filter = ('kind', 'association')
+    date_hierarchy = 'occurred_at'
+    ordering = ('-occurred_at',)
+
+    # The ledger is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReceivablesAgingSnapshot)
+class ReceivablesAgingSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('snapshot_date', 'association', 'building_no', 'bucket',
+                    'invoice_count', 'amount', 'penalty')
+    list_filter = ('bucket', 'association')
+    date_hierarchy = 'snapshot_date'
+    ordering = ('-snapshot_date',)
+
+
 class EventAttendanceInline(admin.TabularInline):
     model = EventAttendance
     extra = 0
@@ -146,7 +198,7 @@ class EventAdmin(admin.ModelAdmin):
 
     def calculate_event_penalties(self, request, queryset):
         for event in queryset:
-            event.calculate_penalty_and_generate_invoices()
+            event.close(created_by=request.user.get_full_name())
         self.message_user(
             request, "Penalties calculated and invoices generated for selected events.")
     calculate_event_penalties.short_description = "Calculate Penalties and Generate Invoices"
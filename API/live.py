@@ -0,0 +1,67 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Seconds of silence after which a comment is sent to keep proxies from
+# closing the stream
+KEEPALIVE_SECONDS = 15
+
+
+class EventBroker:
+    """
+    Fan out the attendance changes of events to the live streams open in
+    this process.
+
+    Every stream owns an `asyncio.Queue` on its event loop. Publishers may run
+    in any thread (the sync views do), so messages are handed to the loops
+    with `call_soon_threadsafe`. The state lives in the process: with several
+    ASGI workers a screen only hears about scans handled by its own worker.
+    """
+    # Messages a slow screen may fall behind by before it is dropped
+    max_backlog = 1000
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id):
+        """Register a stream for `event_id` on the running loop and return its queue."""
+        queue = asyncio.Queue(maxsize=self.max_backlog)
+        with self._lock:
+            self._subscribers[str(event_id)].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, event_id, queue):
+        with self._lock:
+            subscribers = self._subscribers[str(event_id)]
+            subscribers.difference_update(
+                {subscriber for subscriber in subscribers if subscriber[1] is queue})
+            if not subscribers:
+                del self._subscribers[str(event_id)]
+
+    def publish(self, event_id, message):
+        """Send `message` to every stream of `event_id`, from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(event_id), ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, message)
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            # Tell the screen to reconnect and start again from a snapshot
+            message = {"type": "overflow"}
+            while not queue.empty():
+                queue.get_nowait()
+        queue.put_nowait(message)
+
+
+broker = EventBroker()
+
+
+def server_sent_event(kind, data):
+    """Format one server-sent event."""
+    return f"event: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
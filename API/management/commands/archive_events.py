@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from API.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Moves the attendance of old closed events into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.EVENT_ARCHIVE_AFTER_DAYS,
+            help='Archive events held more than this many days ago '
+                 '(default: EVENT_ARCHIVE_AFTER_DAYS).')
+        parser.add_argument(
+            '--association', type=int,
+            help='Only archive the events of this association.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Attendance records copied per INSERT.')
+
+    def handle(self, *args, **options):
+        summary = Event.archive_older_than(
+            options['days'], association=options['association'],
+            chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {summary['records']} attendance records "
+            f"of {summary['events']} events."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from API.models import BalanceCheckpoint
+
+
+class Command(BaseCommand):
+    help = ('Writes the monthly balance checkpoints used by the balance-as-of '
+            'queries. Run it at the start of every month.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only rebuild the checkpoints of this association.')
+
+    def handle(self, *args, **options):
+        written = BalanceCheckpoint.rebuild(association=options['association'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} balance checkpoints."))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from datetime import date
+from API.models import Association, Invoice
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recomputes and stores the penalty of unpaid overdue invoices.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only process the invoices of this association. Runs for '
+                 'different associations touch disjoint rows and can be '
+                 'started in parallel.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of invoices read and written per transaction.')
+
+    def handle(self, *args, **options):
+        today = date.today()
+        chunk_size = options['chunk_size']
+
+        # Unpaid invoices that are overdue, or that still carry a penalty
+        # although they are not overdue anymore (e.g. a moved due date)
+        invoices = Invoice.objects.filter(is_paid=False).filter(
+            Q(due_date__lt=today) | ~Q(penalty=0))
+        if options['association']:
+            invoices = invoices.filter(
+                household__Association_id=options['association'])
+
+        # The penalty only depends on the amount and the due date
+        penalties = {}
+        last_id = 0
+        scanned = 0
+        changed = 0
+        started = time.monotonic()
+
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    invoices.filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .select_for_update(of=('self',))
+                    .select_related('household')
+                    .only('id', 'amount', 'due_date', 'penalty', 'household',
+                          'household__Association')[:chunk_size])
+                if not chunk:
+                    break
+
+                stale = []
+                for invoice in chunk:
+                    key = (invoice.amount, invoice.due_date)
+                    if key not in penalties:
+                        penalties[key] = Invoice.penalty_for(
+                            invoice.amount, (today - invoice.due_date).days)
+                    if invoice.penalty != penalties[key]:
+                        invoice.penalty = penalties[key]
+                        stale.append(invoice)
+
+                Invoice.objects.bulk_update(stale, ['penalty'])
+                Association.bump_version(
+                    invoice.household.Association_id for invoice in stale)
+
+            last_id = chunk[-1].pk
+            scanned += len(chunk)
+            changed += len(stale)
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f"Up to invoice {last_id}: {scanned} scanned, {changed} updated")
+
+        elapsed = time.monotonic() - started
+        rate = scanned / elapsed if elapsed else scanned
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} invoices, updated {changed} penalties "
+            f"in {elapsed:.2f}s ({rate:.0f} rows/s)."))
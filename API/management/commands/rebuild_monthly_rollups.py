@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from API.models import MonthlyRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly income/expense rollups from the ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only rebuild the rollups of this association.')
+
+    def handle(self, *args, **options):
+        written = MonthlyRollup.rebuild(association=options['association'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} monthly rollup rows."))
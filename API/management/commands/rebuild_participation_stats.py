@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from API.models import ParticipationStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-household participation stats from the closed events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only rebuild the stats of this association.')
+
+    def handle(self, *args, **options):
+        written = ParticipationStats.rebuild(association=options['association'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} participation stats rows."))
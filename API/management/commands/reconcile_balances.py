@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from API.models import Association, FinancialSummary
+import django
+import os
+import time
+
+
+def reconcile_chunk(association_ids):
+    # Runs in a worker process with its own database connection
+    return FinancialSummary.reconcile(association_ids)
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the balance of every association from its invoices, '
+            'transactions and ledger and reports (or repairs) differences.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only check this association.')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Number of associations checked per task.')
+        parser.add_argument(
+            '--repair', action='store_true',
+            help='Post the missing movements and correct the stored balances.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        associations = Association.objects.order_by('pk')
+        if options['association']:
+            associations = associations.filter(pk=options['association'])
+        ids = list(associations.values_list('pk', flat=True))
+        size = options['chunk_size']
+        chunks = [ids[start:start + size] for start in range(0, len(ids), size)]
+
+        # Forked workers must not share the parent's connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'],
+                                 initializer=django.setup) as pool:
+            reports = [report for chunk in pool.map(reconcile_chunk, chunks)
+                       for report in chunk]
+
+        drifted = [report for report in reports
+                   if not report['stored'] == report['ledger'] == report['expected']]
+        for report in drifted:
+            self.stdout.write(
+                f"Association {report['association']}: stored {report['stored']}, "
+                f"ledger {report['ledger']}, expected {report['expected']}")
+            if options['repair']:
+                FinancialSummary.repair(report['association'])
+
+        elapsed = time.monotonic() - started
+        action = "repaired" if options['repair'] else "found"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(reports)} associations in {elapsed:.2f}s, "
+            f"{action} {len(drifted)} with differences."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from API.models import ReceivablesAgingSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Stores today\'s receivables aging report for the trend charts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--association', type=int,
+            help='Only snapshot this association.')
+
+    def handle(self, *args, **options):
+        written = ReceivablesAgingSnapshot.take(
+            association=options['association'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} aging snapshot rows."))
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:01
+
+from datetime import datetime, time
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+
+def create_invoice_groups(apps, schema_editor):
+    """Build one group per existing `Invoice.group` value."""
+    Invoice = apps.get_model('API', 'Invoice')
+    InvoiceGroup = apps.get_model('API', 'InvoiceGroup')
+    paid = Q(is_paid=True)
+    groups = Invoice.objects.order_by().values('group').annotate(
+        association_id=Min('household__Association'),
+        description=Max('description'),
+        due_date=Max('due_date'),
+        created_by=Max('created_by'),
+        issued_date=Min('issued_date'),
+        invoice_count=Count('id'),
+        paid_count=Count('id', filter=paid),
+        total_billed=Sum('amount'),
+        total_collected=Sum(F('amount') + F('penalty'), filter=paid),
+    )
+    InvoiceGroup.objects.bulk_create([
+        InvoiceGroup(
+            code=group['group'],
+            association_id=group['association_id'],
+            description=group['description'],
+            due_date=group['due_date'],
+            created_by=group['created_by'],
+            created_at=django.utils.timezone.make_aware(
+                datetime.combine(group['issued_date'], time.min)),
+            invoice_count=group['invoice_count'],
+            paid_count=group['paid_count'],
+            total_billed=group['total_billed'] or 0,
+            total_collected=group['total_collected'] or 0,
+        )
+        for group in groups
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0015_alter_household_building_no'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, default='')),
+                ('due_date', models.DateField(null=True)),
+                ('created_by', models.CharField(default='', max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('total_billed', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_collected', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_groups', to='API.association')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['association', '-created_at'], name='invoicegroup_assoc_created_idx')],
+            },
+        ),
+        migrations.RunPython(create_invoice_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_households(apps, schema_editor):
+    """
+    Make existing duplicates unique before the constraint is added.
+
+    The first household keeps its apartment number, the others are renamed
+    `<apartment>-<n>` so they can be reviewed instead of being deleted.
+    """
+    Household = apps.get_model('API', 'Household')
+    duplicates = (Household.objects.order_by()
+                  .values('Association', 'building_no', 'apartment_number')
+                  .annotate(count=Count('id')).filter(count__gt=1))
+    for duplicate in duplicates:
+        households = Household.objects.filter(
+            Association=duplicate['Association'],
+            building_no=duplicate['building_no'],
+            apartment_number=duplicate['apartment_number']).order_by('id')
+        for number, household in enumerate(households[1:], start=2):
+            suffix = f"-{number}"
+            household.apartment_number = (
+                household.apartment_number[:10 - len(suffix)] + suffix)
+            household.save(update_fields=['apartment_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0016_invoicegroup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventattendance',
+            index=models.Index(fields=['event', 'attended'], name='attendance_event_attended_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialtransaction',
+            index=models.Index(fields=['association', 'date'], name='fintxn_association_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialtransaction',
+            index=models.Index(fields=['association', 'type', 'date'], name='fintxn_assoc_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='householdmember',
+            index=models.Index(fields=['household', 'current_member'], name='member_household_current_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['household', 'is_paid', 'due_date'], name='invoice_household_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['household', 'issued_date'], name='invoice_household_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['group'], name='invoice_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['due_date'], name='invoice_unpaid_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['payment_date'], name='invoice_paid_date_idx'),
+        ),
+        migrations.RunPython(rename_duplicate_households,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='household',
+            constraint=models.UniqueConstraint(fields=('Association', 'building_no', 'apartment_number'), name='unique_household_apartment'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0017_eventattendance_attendance_event_attended_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivablesAgingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('building_no', models.CharField(max_length=100)),
+                ('bucket', models.CharField(choices=[('not_due', 'Not yet due'), ('1_10', '1-10 days overdue'), ('11_30', '11-30 days overdue'), ('over_30', 'More than 30 days overdue')], max_length=10)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('penalty', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aging_snapshots', to='API.association')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('association', 'snapshot_date', 'building_no', 'bucket'), name='unique_aging_snapshot_row')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:07
+
+from datetime import datetime, time
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Post the existing transactions and paid invoices to the ledger, plus one
+    adjustment per association so the entries add up to the current balance.
+    """
+    LedgerEntry = apps.get_model('API', 'LedgerEntry')
+    FinancialTransaction = apps.get_model('API', 'FinancialTransaction')
+    Invoice = apps.get_model('API', 'Invoice')
+    FinancialSummary = apps.get_model('API', 'FinancialSummary')
+
+    totals = {}
+    entries = []
+    for txn in FinancialTransaction.objects.order_by('id').iterator():
+        amount = txn.amount if txn.type == 'income' else -txn.amount
+        entries.append(LedgerEntry(
+            association_id=txn.association_id, kind=txn.type, amount=amount,
+            description=txn.reason, financial_transaction_id=txn.id,
+            occurred_at=txn.date))
+    paid = Invoice.objects.filter(is_paid=True).order_by('id').values(
+        'id', 'amount', 'penalty', 'description', 'payment_date',
+        'issued_date', 'household__Association_id')
+    for invoice in paid.iterator():
+        paid_on = invoice['payment_date'] or invoice['issued_date']
+        entries.append(LedgerEntry(
+            association_id=invoice['household__Association_id'],
+            kind='invoice_payment',
+            amount=invoice['amount'] + invoice['penalty'],
+            description=invoice['description'], invoice_id=invoice['id'],
+            occurred_at=django.utils.timezone.make_aware(
+                datetime.combine(paid_on, time.min))))
+    for entry in entries:
+        totals[entry.association_id] = totals.get(
+            entry.association_id, Decimal(0)) + entry.amount
+
+    for summary in FinancialSummary.objects.all():
+        difference = summary.total_balance - totals.pop(
+            summary.Association_id, Decimal(0))
+        if difference:
+            entries.append(LedgerEntry(
+                association_id=summary.Association_id, kind='adjustment',
+                amount=difference, description='Opening balance'))
+    LedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0018_receivablesagingsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('invoice_payment', 'Invoice payment'), ('income', 'Income'), ('expense', 'Expense'), ('reversal', 'Reversal'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('description', models.TextField(blank=True, default='')),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='API.association')),
+                ('financial_transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='API.financialtransaction')),
+                ('invoice', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='API.invoice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['association', 'occurred_at'], name='ledger_assoc_occurred_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
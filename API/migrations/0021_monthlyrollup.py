@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+
+def rollup_for(kind, amount):
+    # Copy of LedgerEntry.rollup_for at the time of this migration
+    if kind == 'invoice_payment':
+        return 'income', 'invoices', amount
+    if kind == 'adjustment':
+        return ('income' if amount >= 0 else 'expense'), 'adjustments', abs(amount)
+    if kind == 'income' or (kind == 'reversal' and amount < 0):
+        return 'income', 'transactions', amount
+    return 'expense', 'transactions', -amount
+
+
+def build_rollups(apps, schema_editor):
+    """Roll the existing ledger up per association, month, type and category."""
+    LedgerEntry = apps.get_model('API', 'LedgerEntry')
+    MonthlyRollup = apps.get_model('API', 'MonthlyRollup')
+    grouped = (LedgerEntry.objects.annotate(
+        month=TruncMonth('occurred_at', output_field=models.DateField()),
+        positive=Case(When(amount__gte=0, then=Value(True)), default=Value(False)))
+        .order_by().values('association_id', 'month', 'kind', 'positive')
+        .annotate(total=Sum('amount'), count=Count('id')))
+
+    totals = {}
+    for row in grouped:
+        type, category, amount = rollup_for(row['kind'], row['total'])
+        key = (row['association_id'], row['month'], type, category)
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + amount, count + row['count'])
+
+    MonthlyRollup.objects.bulk_create([
+        MonthlyRollup(association_id=association_id, month=month, type=type,
+                      category=category, amount=amount, entry_count=count)
+        for (association_id, month, type, category), (amount, count) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0020_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('category', models.CharField(max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='API.association')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('association', 'month', 'type', 'category'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0021_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialtransaction',
+            name='import_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='financialtransaction',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='financialtransaction',
+            constraint=models.UniqueConstraint(fields=('association', 'import_hash'), name='unique_transaction_import'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0022_financialtransaction_import_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='association',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    """
+    Keep one attendance record per event and household, preferring the one
+    that recorded an attendance, and delete the rest.
+    """
+    EventAttendance = apps.get_model('API', 'EventAttendance')
+    duplicates = (EventAttendance.objects.order_by().values('event', 'household')
+                  .annotate(count=Count('id')).filter(count__gt=1))
+    doomed = []
+    for duplicate in duplicates:
+        ids = list(EventAttendance.objects.filter(
+            event=duplicate['event'], household=duplicate['household'],
+        ).order_by('-attended', 'id').values_list('id', flat=True))
+        doomed.extend(ids[1:])
+    for start in range(0, len(doomed), 500):
+        EventAttendance.objects.filter(pk__in=doomed[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0023_association_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventattendance',
+            constraint=models.UniqueConstraint(fields=('event', 'household'), name='unique_event_household'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0024_eventattendance_unique_event_household'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('type', models.CharField(choices=[('check_in', 'Check in'), ('check_out', 'Check out')], max_length=10)),
+                ('scanned_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attendance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='API.eventattendance')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='API.event')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('event', 'key'), name='unique_attendance_scan')],
+            },
+        ),
+    ]
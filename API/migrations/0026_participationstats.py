@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0025_attendancescan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('event_count', models.IntegerField(default=0)),
+                ('attended_count', models.IntegerField(default=0)),
+                ('late_minutes', models.IntegerField(default=0)),
+                ('penalty_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participation_stats', to='API.association')),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participation_stats', to='API.household')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['association', 'year'], name='participation_assoc_year_idx')],
+                'constraints': [models.UniqueConstraint(fields=('household', 'year'), name='unique_participation_stats')],
+            },
+        ),
+        # The stats are filled once Event.closed_at exists, in 0030
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0026_participationstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='EventAttendanceArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('attended', models.BooleanField(default=False)),
+                ('late_minutes', models.PositiveIntegerField(default=0)),
+                ('entry_time', models.DateTimeField(blank=True, null=True)),
+                ('exit_time', models.DateTimeField(blank=True, null=True)),
+                ('penalty_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='API.event')),
+                ('household', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='API.household')),
+            ],
+        ),
+    ]
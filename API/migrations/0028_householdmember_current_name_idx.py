@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0027_eventattendancearchive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='householdmember',
+            index=models.Index(fields=['-current_member', 'name', 'id'], name='member_current_name_idx'),
+        ),
+    ]
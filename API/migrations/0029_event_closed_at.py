@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:37
+
+from datetime import datetime, time
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import CharField, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def mark_closed_events(apps, schema_editor):
+    """Set `closed_at` on the events whose penalties were already invoiced."""
+    Event = apps.get_model('API', 'Event')
+    EventAttendance = apps.get_model('API', 'EventAttendance')
+    EventAttendanceArchive = apps.get_model('API', 'EventAttendanceArchive')
+    Invoice = apps.get_model('API', 'Invoice')
+    InvoiceGroup = apps.get_model('API', 'InvoiceGroup')
+
+    # Closed by Event.close: the penalties went to the "event-<pk>" group
+    group = InvoiceGroup.objects.filter(code=Concat(
+        Value('event-'), Cast(OuterRef('pk'), CharField())))
+    Event.objects.filter(Exists(group)).update(
+        closed_at=Subquery(group.values('created_at')[:1]))
+
+    # Closed by the former calculate_penalty_and_generate_invoices: it stored
+    # the penalties on the sheet and issued "Penalty for event <name>"
+    # invoices under random group codes
+    penalized = Exists(EventAttendance.objects.filter(
+        event=OuterRef('pk'), penalty_amount__gt=0)) | Exists(
+        EventAttendanceArchive.objects.filter(event=OuterRef('pk'), penalty_amount__gt=0))
+    for event in Event.objects.filter(penalized, closed_at__isnull=True).iterator():
+        issued = Invoice.objects.filter(
+            household__Association_id=event.association_id,
+            description=f"Penalty for event {event.name}",
+            issued_date__gte=event.date,
+        ).order_by('issued_date').values_list('issued_date', flat=True).first()
+        event.closed_at = django.utils.timezone.make_aware(
+            datetime.combine(issued or event.date, time.min))
+        event.save(update_fields=['closed_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0028_householdmember_current_name_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_closed_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-18 06:39
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+
+
+def build_participation_stats(apps, schema_editor):
+    """Add up the live and archived attendance sheets of the closed events."""
+    EventAttendance = apps.get_model('API', 'EventAttendance')
+    EventAttendanceArchive = apps.get_model('API', 'EventAttendanceArchive')
+    ParticipationStats = apps.get_model('API', 'ParticipationStats')
+    totals = {}
+    for model in (EventAttendance, EventAttendanceArchive):
+        grouped = (model.objects.filter(event__closed_at__isnull=False)
+                   .annotate(year=ExtractYear('event__date'))
+                   .order_by().values('household_id', 'event__association_id', 'year')
+                   .annotate(event_count=Count('id'),
+                             attended_count=Count('id', filter=Q(attended=True)),
+                             late_minutes=Sum('late_minutes'),
+                             penalty_total=Sum('penalty_amount')))
+        for row in grouped:
+            key = (row['household_id'], row['event__association_id'], row['year'])
+            total = totals.setdefault(key, [0, 0, 0, Decimal(0)])
+            total[0] += row['event_count']
+            total[1] += row['attended_count']
+            total[2] += row['late_minutes']
+            total[3] += row['penalty_total']
+    ParticipationStats.objects.all().delete()
+    ParticipationStats.objects.bulk_create([
+        ParticipationStats(
+            household_id=household_id, association_id=association_id, year=year,
+            event_count=event_count, attended_count=attended_count,
+            late_minutes=late_minutes, penalty_total=penalty_total)
+        for (household_id, association_id, year),
+        (event_count, attended_count, late_minutes, penalty_total) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('API', '0029_event_closed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancescan',
+            name='attendance',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='API.eventattendance'),
+        ),
+        migrations.RunPython(build_participation_stats, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,33 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 import uuid
-from decimal import Decimal
+import hashlib
+from decimal import ROUND_HALF_UP, Decimal
 from datetime import date, timedelta
-from datetime import datetime
+from datetime import datetime, time
 import os
-from django.db import models
+from itertools import islice
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, Q, Sum, Value, When, Window
+from django.db.models.lookups import LessThanOrEqual
+from django.db.models.functions import Cast, ExtractYear, NullIf, Rank, Round, TruncMonth
 from django.contrib.auth.models import AbstractUser
-from django.utils.timezone import now
+from django.core.cache import cache
+from django.utils.timezone import localdate, localtime, make_aware, now
 
 
 # Association Model
 class Association(models.Model):
     place = models.CharField(max_length=100, unique=True)
     building_numbers = models.CharField(max_length=100)
+    # Bumped on every change to the association's data, for ETags
+    data_version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def bump_version(cls, association_ids):
+        """Bump the data version of `association_ids` with one atomic UPDATE."""
+        cls.objects.filter(pk__in=set(association_ids)).update(
+            data_version=F('data_version') + 1)
 
     def __str__(self):
         return f"{self.place} - {self.building_numbers}"
@@ -71,6 +85,47 @@ class Household(models.Model):
     documents = models.FileField(
         upload_to=household_document_path, blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['Association', 'building_no', 'apartment_number'],
+                name='unique_household_apartment'),
+        ]
+
+    @staticmethod
+    def statement_cache_key(household_id):
+        """Cache key of today's invoice statement, penalties change every day."""
+        return f"household-statement:{household_id}:{date.today().isoformat()}"
+
+    @classmethod
+    def invalidate_statements(cls, household_ids):
+        """Drop the cached invoice statements of `household_ids` once the transaction commits."""
+        keys = [cls.statement_cache_key(pk) for pk in set(household_ids)]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def invoice_statement(self):
+        """
+        Return the paid and unpaid invoices of the household with their totals.
+
+        The totals come from one conditional aggregation and the invoices from
+        one list query, both carrying the penalty annotated by
+        `InvoiceQuerySet.with_penalty`.
+        """
+        invoices = self.invoices.with_penalty()
+        paid = Q(is_paid=True)
+        totals = invoices.aggregate(
+            paid_amount=Sum('amount', filter=paid, default=0),
+            paid_penalty=Sum('current_penalty', filter=paid, default=0),
+            not_paid_amount=Sum('amount', filter=~paid, default=0),
+            not_paid_penalty=Sum('current_penalty', filter=~paid, default=0),
+        )
+        rows = list(invoices.order_by('due_date', 'id'))
+        return {
+            "paid": [invoice for invoice in rows if invoice.is_paid],
+            "not_paid": [invoice for invoice in rows if not invoice.is_paid],
+            **totals,
+        }
+
     def __str__(self):
         return f"Apt {self.apartment_number}, Building {self.building_no} {self.head_of_household}"
 
@@ -95,6 +150,15 @@ class HouseholdMember(models.Model):
     contact_number = models.CharField(max_length=15, blank=True, null=True)
     current_member = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['household', 'current_member'],
+                         name='member_household_current_idx'),
+            # Serves the keyset pagination of the member list
+            models.Index(fields=['-current_member', 'name', 'id'],
+                         name='member_current_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.role}) - Apt {self.household.apartment_number}, Building {self.household.building_no}"
 
@@ -108,25 +172,120 @@ class FinancialSummary(models.Model):
     Association = models.ForeignKey(
         Association,  on_delete=models.CASCADE)
 
-    def add_income(self, amount):
-        """Add income to the total balance."""
+    def add_income(self, amount, description=""):
+        """Add income to the total balance through the ledger."""
         if not isinstance(amount, Decimal):
             amount = Decimal(amount)
         if amount > 0:
-            self.total_balance += amount
-            self.save()
+            LedgerEntry.post([LedgerEntry(
+                association_id=self.Association_id, kind='adjustment',
+                amount=amount, description=description)])
+            self.refresh_from_db(fields=['total_balance'])
 
-    def deduct_expense(self, amount):
-        print("expence deducted")
+    def deduct_expense(self, amount, description=""):
+        """Deduct an expense from the total balance through the ledger."""
         if not isinstance(amount, Decimal):
             amount = Decimal(amount)
-        # Deduct expense from the total balance.
-        if amount > 0 and amount <= self.total_balance:
-
-            self.total_balance -= amount
-            self.save()
-        elif amount > self.total_balance:
-            raise ValueError("Insufficient balance for this expense")
+        if amount > 0:
+            LedgerEntry.post([LedgerEntry(
+                association_id=self.Association_id, kind='adjustment',
+                amount=-amount, description=description)], require_funds=True)
+            self.refresh_from_db(fields=['total_balance'])
+
+    @classmethod
+    def reconcile(cls, association_ids):
+        """
+        Compare the stored balances of `association_ids` with their sources.
+
+        The invoice payments and transaction movements in the ledger are
+        checked against the paid invoices and the transactions, with one
+        grouped query per table. Payments of invoices deleted since stay in
+        the ledger and are not compared: the money was collected. The
+        expected balance is the sum of those sources and the manual
+        adjustments.
+
+        Returns:
+            list: One dict per association with the `stored`, `ledger` and
+                  `expected` balances and the `invoice_gap` and
+                  `transaction_gap` missing from the ledger.
+        """
+        def totals(queryset, key, total):
+            return dict(queryset.order_by().values_list(key).annotate(total=total))
+
+        transactions = totals(
+            FinancialTransaction.objects.filter(association_id__in=association_ids),
+            'association_id',
+            Sum(Case(When(type='income', then=F('amount')), default=-F('amount'))))
+        invoices = totals(
+            Invoice.objects.filter(household__Association_id__in=association_ids,
+                                   is_paid=True),
+            'household__Association_id', Sum(F('amount') + F('penalty')))
+        # Reconciliation entries have no invoice
+        invoice_kept = Q(invoice_id__isnull=True) | Q(models.Exists(
+            Invoice.objects.filter(pk=models.OuterRef('invoice_id'))))
+        ledger = {
+            association_id: (total, posted_invoices, posted_transactions)
+            for association_id, total, posted_invoices, posted_transactions in
+            LedgerEntry.objects.filter(association_id__in=association_ids)
+            .order_by().values_list('association_id').annotate(
+                total=Sum('amount'),
+                invoices=Sum('amount', filter=Q(kind='invoice_payment') & invoice_kept,
+                             default=0),
+                transactions=Sum('amount', filter=~Q(kind__in=['invoice_payment', 'adjustment']),
+                                 default=0))
+        }
+
+        stored = cls.objects.filter(Association_id__in=association_ids).values_list(
+            'Association_id', 'total_balance')
+        cent = Decimal('0.01')
+        reports = []
+        for association_id, balance in stored:
+            total, posted_invoices, posted_transactions = ledger.get(
+                association_id, (0, 0, 0))
+            invoice_gap = Decimal(
+                (invoices.get(association_id) or 0) - posted_invoices).quantize(cent)
+            transaction_gap = Decimal(
+                (transactions.get(association_id) or 0) - posted_transactions).quantize(cent)
+            total = Decimal(total).quantize(cent)
+            reports.append({
+                "association": association_id,
+                "stored": balance,
+                "ledger": total,
+                "expected": total + invoice_gap + transaction_gap,
+                "invoice_gap": invoice_gap,
+                "transaction_gap": transaction_gap,
+            })
+        return reports
+
+    @classmethod
+    def repair(cls, association_id):
+        """
+        Bring the balance of `association_id` back in line with its sources.
+
+        A stored balance that disagrees with the ledger is corrected to match
+        it, then the movements missing from the ledger are posted as
+        reconciliation entries.
+
+        Returns:
+            dict: The report the repair was based on.
+        """
+        with transaction.atomic():
+            list(cls.objects.select_for_update().filter(Association_id=association_id))
+            report = cls.reconcile([association_id])[0]
+            if report["stored"] != report["ledger"]:
+                cls.objects.filter(Association_id=association_id).update(
+                    total_balance=F('total_balance') + report["ledger"] - report["stored"])
+                # The UPDATE bypasses LedgerEntry.post, so the ETags are dropped here
+                Association.bump_version([association_id])
+            entries = [
+                LedgerEntry(association_id=association_id, kind=kind,
+                            amount=report[gap], description="Reconciliation")
+                for kind, gap in (('invoice_payment', 'invoice_gap'),
+                                  ('income', 'transaction_gap'))
+                if report[gap]
+            ]
+            LedgerEntry.post(entries)
+        return report
 
     def __str__(self):
         return f"Total Balance: {self.total_balance}"
@@ -138,7 +297,454 @@ def create_financial_summary(sender, instance, created, **kwargs):
         FinancialSummary.objects.create(Association=instance)
 
 
+class LedgerEntry(models.Model):
+    """
+    One movement of an association's balance.
+
+    Entries are only ever appended: a correction is a new entry with the
+    opposite sign, so the balance of an association is the sum of its
+    entries. Invoices and transactions are referenced without a database
+    constraint, so deleting them keeps their history (and keeps invoice
+    deletes a single DELETE).
+    """
+    ENTRY_KINDS = (
+        ('invoice_payment', 'Invoice payment'),
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+        ('reversal', 'Reversal'),
+        ('adjustment', 'Adjustment'),
+    )
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="ledger_entries")
+    kind = models.CharField(max_length=20, choices=ENTRY_KINDS)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    description = models.TextField(blank=True, default="")
+    invoice = models.ForeignKey(
+        'Invoice', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+')
+    financial_transaction = models.ForeignKey(
+        'FinancialTransaction', on_delete=models.DO_NOTHING,
+        db_constraint=False, null=True, blank=True, related_name='+')
+    occurred_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['association', 'occurred_at'],
+                         name='ledger_assoc_occurred_idx'),
+        ]
+
+    @classmethod
+    def post(cls, entries, require_funds=False):
+        """
+        Append `entries` to the ledger and apply them to the balances.
+
+        Each association's balance moves with one atomic `F()` increment of
+        the net amount, so concurrent postings never overwrite each other.
+
+        Args:
+            entries (iterable): Unsaved `LedgerEntry` objects.
+            require_funds (bool): Refuse a net decrease that would take a
+                balance below zero.
+
+        Raises:
+            ValueError: If `require_funds` is set and a balance is too low.
+        """
+        entries = list(entries)
+        totals = {}
+        for entry in entries:
+            totals[entry.association_id] = totals.get(
+                entry.association_id, Decimal(0)) + Decimal(entry.amount)
+
+        with transaction.atomic():
+            for association_id, total in totals.items():
+                summaries = FinancialSummary.objects.filter(
+                    Association_id=association_id)
+                if require_funds and total < 0:
+                    # The condition is checked by the UPDATE itself
+                    updated = summaries.filter(
+                        total_balance__gte=-total).update(
+                        total_balance=F('total_balance') + total)
+                    if not updated:
+                        raise ValueError("Insufficient balance for this expense")
+                else:
+                    summaries.update(total_balance=F('total_balance') + total)
+            cls.objects.bulk_create(entries)
+
+            # Backdated entries also move the checkpoints that follow them
+            month_start = localdate().replace(day=1)
+            backdated = {}
+            for entry in entries:
+                day = localdate(entry.occurred_at)
+                if day < month_start:
+                    following = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+                    key = (entry.association_id, following)
+                    backdated[key] = backdated.get(key, Decimal(0)) + Decimal(entry.amount)
+            for (association_id, following), amount in backdated.items():
+                BalanceCheckpoint.objects.filter(
+                    association_id=association_id, month__gte=following).update(
+                    balance=F('balance') + amount)
+
+            MonthlyRollup.record(entries)
+            Association.bump_version(totals)
+        return entries
+
+    @staticmethod
+    def rollup_for(kind, amount):
+        """
+        Return the `(type, category, amount)` a movement adds to the rollups.
+
+        Reversals count against the type they reverse, so deleting an income
+        lowers the income of the month it is deleted in.
+        """
+        if kind == 'invoice_payment':
+            return 'income', 'invoices', amount
+        if kind == 'adjustment':
+            return ('income' if amount >= 0 else 'expense'), 'adjustments', abs(amount)
+        if kind == 'income' or (kind == 'reversal' and amount < 0):
+            return 'income', 'transactions', amount
+        return 'expense', 'transactions', -amount
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.amount}"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    The balance of an association at the start of a month.
+
+    A past balance is the closest checkpoint plus the ledger entries since
+    it, so answering it never reads more than one month of the ledger.
+    """
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="balance_checkpoints")
+    month = models.DateField()  # First day of the month
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['association', 'month'],
+                                    name='unique_balance_checkpoint'),
+        ]
+
+    @staticmethod
+    def start_of(day):
+        """Return the moment `day` starts at, e.g. when a checkpoint is taken."""
+        return make_aware(datetime.combine(day, time.min))
+
+    @classmethod
+    def rebuild(cls, association=None, until=None):
+        """
+        Write the checkpoints of every month up to the month of `until`.
+
+        The ledger is summed per month in one grouped query and the running
+        total is stored as the opening balance of each following month.
+
+        Returns:
+            int: The number of checkpoints written.
+        """
+        until = (until or localdate()).replace(day=1)
+        entries = LedgerEntry.objects.all()
+        if association is not None:
+            entries = entries.filter(association=association)
+        monthly = (entries.annotate(month=TruncMonth('occurred_at', output_field=models.DateField()))
+                   .order_by().values('association_id', 'month')
+                   .annotate(total=Sum('amount'))
+                   .order_by('association_id', 'month'))
+
+        totals = {}
+        for row in monthly:
+            totals.setdefault(row['association_id'], {})[row['month']] = row['total']
+
+        checkpoints = []
+        for association_id, months in totals.items():
+            month = min(months)
+            balance = Decimal(0)
+            while month <= until:
+                checkpoints.append(cls(association_id=association_id,
+                                       month=month, balance=balance))
+                balance += months.get(month, 0)
+                month = (month + timedelta(days=32)).replace(day=1)
+
+        cls.objects.bulk_create(
+            checkpoints, batch_size=500, update_conflicts=True,
+            unique_fields=['association', 'month'], update_fields=['balance'])
+        return len(checkpoints)
+
+    @classmethod
+    def balance_as_of(cls, association, moment):
+        """
+        Return the balance of `association` just before `moment`.
+
+        Reads the closest checkpoint and the ledger entries between it and
+        `moment`, with their running balance computed by a window function.
+
+        Returns:
+            dict: `balance`, the `checkpoint` month used (None when there is
+                  none yet) and the `entries` since it.
+        """
+        checkpoint = (cls.objects.filter(association=association,
+                                         month__lte=localdate(moment))
+                      .order_by('-month').first())
+        opening = checkpoint.balance if checkpoint else Decimal(0)
+
+        entries = LedgerEntry.objects.filter(
+            association=association, occurred_at__lt=moment)
+        if checkpoint:
+            entries = entries.filter(
+                occurred_at__gte=cls.start_of(checkpoint.month))
+        entries = entries.annotate(running_balance=Window(
+            Sum('amount'), order_by=[F('occurred_at').asc(), F('id').asc()]))
+        rows = list(entries.order_by('occurred_at', 'id').values(
+            'id', 'occurred_at', 'kind', 'amount', 'description',
+            'running_balance'))
+
+        for row in rows:
+            row['running_balance'] = (
+                opening + row['running_balance']).quantize(Decimal('0.01'))
+        return {
+            "balance": rows[-1]['running_balance'] if rows else opening,
+            "checkpoint": checkpoint.month if checkpoint else None,
+            "entries": rows,
+        }
+
+    def __str__(self):
+        return f"{self.association} {self.month:%Y-%m}: {self.balance}"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Income or expense of an association for one month and category.
+
+    The rows are kept up to date by `LedgerEntry.post`, so dashboards read a
+    handful of rows per month instead of aggregating the raw tables.
+    """
+    TYPES = (
+        ('income', 'Income'),
+        ('expense', 'Expense'),
+    )
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="monthly_rollups")
+    month = models.DateField()  # First day of the month
+    type = models.CharField(max_length=10, choices=TYPES)
+    category = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['association', 'month', 'type', 'category'],
+                                    name='unique_monthly_rollup'),
+        ]
+
+    @classmethod
+    def record(cls, entries):
+        """Add the ledger `entries` to their rollup rows with `F()` increments."""
+        deltas = {}
+        for entry in entries:
+            type, category, amount = LedgerEntry.rollup_for(
+                entry.kind, Decimal(entry.amount))
+            key = (entry.association_id,
+                   localdate(entry.occurred_at).replace(day=1), type, category)
+            total, count = deltas.get(key, (Decimal(0), 0))
+            deltas[key] = (total + amount, count + 1)
+
+        for (association_id, month, type, category), (amount, count) in deltas.items():
+            rows = cls.objects.filter(association_id=association_id, month=month,
+                                      type=type, category=category)
+            increment = {"amount": F('amount') + amount,
+                         "entry_count": F('entry_count') + count}
+            if rows.update(**increment):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        association_id=association_id, month=month, type=type,
+                        category=category, amount=amount, entry_count=count)
+            except IntegrityError:
+                # Another worker created the row first
+                rows.update(**increment)
+
+    @classmethod
+    def rebuild(cls, association=None):
+        """
+        Recompute the rollups from the ledger.
+
+        Returns:
+            int: The number of rollup rows written.
+        """
+        entries = LedgerEntry.objects.all()
+        rollups = cls.objects.all()
+        if association is not None:
+            entries = entries.filter(association=association)
+            rollups = rollups.filter(association=association)
+
+        grouped = (entries.annotate(
+            month=TruncMonth('occurred_at', output_field=models.DateField()),
+            positive=Case(When(amount__gte=0, then=Value(True)), default=Value(False)))
+            .order_by().values('association_id', 'month', 'kind', 'positive')
+            .annotate(total=Sum('amount'), count=Count('id')))
+
+        totals = {}
+        for row in grouped:
+            type, category, amount = LedgerEntry.rollup_for(
+                row['kind'], Decimal(row['total']))
+            key = (row['association_id'], row['month'], type, category)
+            total, count = totals.get(key, (Decimal(0), 0))
+            totals[key] = (total + amount, count + row['count'])
+
+        with transaction.atomic():
+            rollups.delete()
+            cls.objects.bulk_create([
+                cls(association_id=association_id, month=month, type=type,
+                    category=category, amount=amount, entry_count=count)
+                for (association_id, month, type, category), (amount, count)
+                in totals.items()
+            ], batch_size=500)
+        return len(totals)
+
+    def __str__(self):
+        return f"{self.association} {self.month:%Y-%m} {self.type}/{self.category}: {self.amount}"
+
+
+class InvoiceGroup(models.Model):
+    """
+    A batch of invoices issued together, identified by `Invoice.group`.
+
+    The counters are maintained incrementally as invoices of the group are
+    created, paid or deleted, so listing groups with their progress never
+    scans the invoice table.
+    """
+    code = models.CharField(max_length=100, unique=True)
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="invoice_groups")
+    description = models.TextField(blank=True, default="")
+    due_date = models.DateField(null=True)
+    created_by = models.CharField(max_length=100, default="")
+    created_at = models.DateTimeField(default=now)
+    invoice_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+    total_billed = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0)
+    total_collected = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['association', '-created_at'],
+                         name='invoicegroup_assoc_created_idx'),
+        ]
+
+    @classmethod
+    def bump(cls, code, invoice_count=0, paid_count=0, total_billed=0,
+             total_collected=0):
+        """Apply deltas to the counters of group `code` with one atomic UPDATE."""
+        cls.objects.filter(code=code).update(
+            invoice_count=F('invoice_count') + invoice_count,
+            paid_count=F('paid_count') + paid_count,
+            total_billed=F('total_billed') + total_billed,
+            total_collected=F('total_collected') + total_collected,
+        )
+
+    def __str__(self):
+        return f"{self.code} - {self.description}"
+
+
+class DaysSince(models.Func):
+    """Whole days from the date `expression` up to the date `day`."""
+    arg_joiner = ' - '
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, day):
+        super().__init__(Value(day, output_field=models.DateField()), expression)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, arg_joiner=') - julianday(',
+            template='CAST(julianday(%(expressions)s) AS INTEGER)', **extra_context)
+
+
+class InvoiceQuerySet(models.QuerySet):
+
+    def penalty_expression(self, today=None):
+        """
+        Return an expression evaluating to the penalty of each invoice.
+
+        The tiers of `Invoice.penalty_rate` are computed from the days
+        overdue, and the penalty is rounded half up to whole cents with
+        integer arithmetic, so the values are identical to
+        `Invoice.penalty_for` on every database. Paid invoices keep the
+        penalty that was frozen when they were settled.
+        """
+        today = today or date.today()
+        days = DaysSince('due_date', today)
+        rate = Case(
+            When(LessThanOrEqual(days, 10), then=2 * days),
+            When(LessThanOrEqual(days, 30), then=20 + 4 * (days - 10)),
+            default=100 + 5 * (days - 30),
+            output_field=models.IntegerField())
+        cents = Cast(Round(F('amount') * 100), models.IntegerField())
+        penalty = ExpressionWrapper(
+            (cents * rate + 50) / 100 * Value(Decimal('0.01')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2))
+        return Case(
+            When(is_paid=True, then=F('penalty')),
+            When(due_date__lt=today, then=penalty),
+            default=Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+    def with_penalty(self, today=None):
+        """
+        Annotate `current_penalty` and `current_status` on every invoice.
+
+        See `penalty_expression`; totals can be summed in the same query that
+        lists the invoices.
+        """
+        today = today or date.today()
+        return self.annotate(
+            current_penalty=self.penalty_expression(today),
+            current_status=Case(
+                When(is_paid=True, then=Value("Paid")),
+                When(due_date__lt=today, then=Value("Overdue")),
+                default=Value("Pending"),
+                output_field=models.CharField()),
+        )
+
+    def aging(self, today=None):
+        """
+        Group the unpaid invoices per association, building and aging bucket.
+
+        The buckets follow the tiers of `Invoice.penalty_for`. Each row holds
+        `invoice_count`, `amount` and `penalty` and everything comes from one
+        grouped query.
+        """
+        today = today or date.today()
+        return (
+            self.filter(is_paid=False)
+            .annotate(
+                current_penalty=self.penalty_expression(today),
+                bucket=Case(
+                    When(due_date__gte=today, then=Value('not_due')),
+                    When(due_date__gte=today - timedelta(days=10),
+                         then=Value('1_10')),
+                    When(due_date__gte=today - timedelta(days=30),
+                         then=Value('11_30')),
+                    default=Value('over_30'),
+                    output_field=models.CharField()))
+            .values('household__Association_id', 'household__building_no', 'bucket')
+            .annotate(invoice_count=Count('id'), amount=Sum('amount'),
+                      penalty=Sum('current_penalty'))
+            .order_by('household__Association_id', 'household__building_no', 'bucket')
+        )
+
+
 class Invoice(models.Model):
+    AGING_BUCKETS = (
+        ('not_due', 'Not yet due'),
+        ('1_10', '1-10 days overdue'),
+        ('11_30', '11-30 days overdue'),
+        ('over_30', 'More than 30 days overdue'),
+    )
+
     household = models.ForeignKey(
         Household, on_delete=models.CASCADE, related_name="invoices"
     )
@@ -153,53 +759,392 @@ class Invoice(models.Model):
     payment_date = models.DateField(null=True)
     group = models.CharField(max_length=100, default=uuid.uuid4)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['household', 'is_paid', 'due_date'],
+                         name='invoice_household_paid_idx'),
+            models.Index(fields=['household', 'issued_date'],
+                         name='invoice_household_issued_idx'),
+            models.Index(fields=['group'], name='invoice_group_idx'),
+            # Overdue scans only ever look at unpaid invoices
+            models.Index(fields=['due_date'], condition=Q(is_paid=False),
+                         name='invoice_unpaid_due_idx'),
+            models.Index(fields=['payment_date'], condition=Q(is_paid=True),
+                         name='invoice_paid_date_idx'),
+        ]
+
+    objects = InvoiceQuerySet.as_manager()
+
+    @staticmethod
+    def penalty_rate(overdue_days):
+        """Return the penalty, in percent of the amount, after `overdue_days` days."""
+        if overdue_days <= 10:
+            # 2% per day for the first 10 days
+            return 2 * overdue_days
+        if overdue_days <= 30:
+            # 4% per day for the next 20 days
+            return 20 + 4 * (overdue_days - 10)
+        # 5% per day above 30
+        return 100 + 5 * (overdue_days - 30)
+
+    @classmethod
+    def penalty_for(cls, amount, overdue_days):
+        """Return the penalty owed on `amount` after `overdue_days` days."""
+        if overdue_days <= 0:
+            return Decimal('0.00')
+        penalty = Decimal(amount) * cls.penalty_rate(overdue_days) / 100
+        return penalty.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
     def calculate_penalty(self):
         """Calculate the penalty based on overdue duration."""
-        if not self.is_paid and date.today() > self.due_date:
+        if self.is_paid:
+            # The penalty is frozen when the invoice is settled
+            return self.penalty
+        if date.today() > self.due_date:
             overdue_days = (date.today() - self.due_date).days
-            base_penalty = 0
-
-            if overdue_days <= 10:
-                base_penalty = self.amount * Decimal(0.02 * overdue_days)
-            elif 10 < overdue_days <= 30:
-                base_penalty = (
-                    # 2% for the first 10 days
-                    self.amount * Decimal(0.02 * 10) +
-                    # 4% for the remaining days
-                    self.amount * Decimal(0.04 * (overdue_days - 10))
-                )
-            else:
-                base_penalty = (
-                    # 2% for the first 10 days
-                    self.amount * Decimal(0.02 * 10) +
-                    # 4% for the next 20 days
-                    self.amount * Decimal(0.04 * 20) +
-                    # 5% for days above 30
-                    self.amount * Decimal(0.05 * (overdue_days - 30))
-                )
-
-            self.penalty = round(base_penalty, 2)
+            self.penalty = self.penalty_for(self.amount, overdue_days)
         else:
             self.penalty = 0
         return self.penalty
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored payment state so save() can detect a payment
+        instance._paid_in_db = dict(zip(field_names, values)).get('is_paid')
+        return instance
+
     def save(self, *args, **kwargs):
         """Override save to calculate penalty before saving."""
-        self.calculate_penalty()
-        super().save(*args, **kwargs)
+        created = self._state.adding
+        paid_in_db = getattr(self, '_paid_in_db', None)
+        if paid_in_db is None and not created:
+            # is_paid was deferred when the invoice was loaded, so read it now
+            paid_in_db = Invoice.objects.filter(pk=self.pk).values_list(
+                'is_paid', flat=True).first()
+        newly_paid = self.is_paid and not paid_in_db
+        if newly_paid:
+            # Freeze the penalty owed at the time of payment
+            self.penalty = self.penalty_for(
+                self.amount, (date.today() - self.due_date).days)
+        else:
+            self.calculate_penalty()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Household.invalidate_statements([self.household_id])
+
+            # Keep the counters of the invoice group in step
+            if created:
+                InvoiceGroup.objects.get_or_create(code=self.group, defaults={
+                    "association_id": self.household.Association_id,
+                    "description": self.description,
+                    "due_date": self.due_date,
+                    "created_by": self.created_by,
+                })
+                InvoiceGroup.bump(self.group, invoice_count=1,
+                                  total_billed=self.amount)
+            # Only the unpaid -> paid transition moves the balance
+            if newly_paid:
+                InvoiceGroup.bump(self.group, paid_count=1,
+                                  total_collected=self.amount + self.penalty)
+                LedgerEntry.post([LedgerEntry(
+                    association_id=self.household.Association_id,
+                    kind='invoice_payment', amount=self.amount + self.penalty,
+                    invoice=self, description=self.description)])
+        self._paid_in_db = self.is_paid
 
-        # Update financial summary when invoice is paid
-        if self.is_paid:
-            # Assume a single record for simplicity
-            financial_summary = FinancialSummary.objects.filter(
-                Association=self.household.Association).first()
-            if financial_summary:
-                financial_summary.add_income(self.amount + self.penalty)
+    def delete(self, *args, **kwargs):
+        """Override delete to take the invoice out of its group counters."""
+        result = super().delete(*args, **kwargs)
+        Household.invalidate_statements([self.household_id])
+        Association.bump_version([self.household.Association_id])
+        InvoiceGroup.bump(
+            self.group, invoice_count=-1, total_billed=-self.amount,
+            paid_count=-1 if self.is_paid else 0,
+            total_collected=-(self.amount + self.penalty) if self.is_paid else 0)
+        return result
+
+    @classmethod
+    def detach(cls, invoices):
+        """
+        Take the `invoices` queryset out of its group counters before it is deleted.
+
+        Bulk deletes skip `delete()`, so the admin and the household cascade
+        call this instead; the counters move with one grouped query, and the
+        statements and ETags of the households involved are dropped.
+        """
+        owners = list(invoices.order_by().values_list(
+            'household_id', 'household__Association_id').distinct())
+        Household.invalidate_statements(household_id for household_id, _ in owners)
+        Association.bump_version(association_id for _, association_id in owners)
+        paid = Q(is_paid=True)
+        groups = invoices.order_by().values('group').annotate(
+            count=Count('id'), billed=Sum('amount'), paid_count=Count('id', filter=paid),
+            collected=Sum(F('amount') + F('penalty'), filter=paid, default=0))
+        for group in groups:
+            InvoiceGroup.bump(group['group'], invoice_count=-group['count'],
+                              paid_count=-group['paid_count'],
+                              total_billed=-group['billed'],
+                              total_collected=-group['collected'])
+
+    @classmethod
+    def issue(cls, association, items, description, due_date, created_by="",
+              group=None, chunk_size=500):
+        """
+        Issue one invoice per `(household_id, amount)` pair in a single transaction.
+
+        Rows are inserted with `bulk_create` in chunks of `chunk_size`, so
+        `save()` is skipped: new invoices are not overdue yet (no penalty) and
+        unpaid (no income), and the group counters are bumped once at the end.
+
+        Returns:
+            dict: A compact summary of the created group.
+
+        Raises:
+            ValueError: If `group` is the code of another association's group.
+        """
+        issued_date = now()
+        count = 0
+        total_amount = Decimal(0)
+        items = iter(items)
+        details = {
+            "association": association,
+            "description": description,
+            "due_date": due_date,
+            "created_by": created_by,
+        }
+
+        with transaction.atomic():
+            if group is None:
+                # Codes are unique across all associations, so they are never shortened
+                group = uuid.uuid4().hex
+                InvoiceGroup.objects.create(code=group, **details)
+            else:
+                existing, _ = InvoiceGroup.objects.get_or_create(code=group, defaults=details)
+                if existing.association_id != association.pk:
+                    raise ValueError("The invoice group belongs to another association.")
+            while True:
+                chunk = [
+                    cls(household_id=household_id, amount=amount,
+                        description=description, due_date=due_date,
+                        issued_date=issued_date, created_by=created_by,
+                        group=group)
+                    for household_id, amount in islice(items, chunk_size)
+                ]
+                if not chunk:
+                    break
+                cls.objects.bulk_create(chunk)
+                Household.invalidate_statements(
+                    invoice.household_id for invoice in chunk)
+                count += len(chunk)
+                total_amount += sum(Decimal(invoice.amount)
+                                    for invoice in chunk)
+            InvoiceGroup.bump(group, invoice_count=count,
+                              total_billed=total_amount)
+            Association.bump_version([association.pk])
+
+        return {
+            "group": group,
+            "count": count,
+            "total_amount": total_amount,
+            "description": description,
+            "due_date": due_date,
+        }
+
+    @classmethod
+    def settle(cls, invoices, accepted_by="", requested_ids=None):
+        """
+        Mark every unpaid invoice of the `invoices` queryset as paid.
+
+        The rows are locked, settled with a single UPDATE that also freezes
+        their current penalty, and one ledger entry per invoice is posted,
+        raising the balance of each association with one atomic `F()`
+        increment, all inside one transaction.
+
+        Args:
+            invoices (QuerySet): The invoices to settle.
+            accepted_by (str): Name stored in `payment_accepted_by`.
+            requested_ids (iterable): Ids the caller asked for; the ones that
+                are not part of `invoices` are reported as `not_found`.
+
+        Returns:
+            dict: `updated`, `paid_amount` and one result per invoice.
+        """
+        today = date.today()
+        with transaction.atomic():
+            penalty = invoices.penalty_expression(today)
+            rows = list(
+                invoices.annotate(current_penalty=penalty)
+                .select_for_update(of=('self',))
+                .order_by('id')
+                .values('id', 'is_paid', 'amount', 'current_penalty', 'group',
+                        'description', 'household_id',
+                        'household__Association_id'))
+
+            results = []
+            income = {}
+            collected = {}
+            payable = []
+            entries = []
+            for row in rows:
+                if row['is_paid']:
+                    results.append({"id": row['id'], "status": "already_paid"})
+                    continue
+                current_penalty = Decimal(row['current_penalty']).quantize(
+                    Decimal('0.01'))
+                paid = row['amount'] + current_penalty
+                association_id = row['household__Association_id']
+                income[association_id] = income.get(
+                    association_id, Decimal(0)) + paid
+                count, total = collected.get(row['group'], (0, Decimal(0)))
+                collected[row['group']] = (count + 1, total + paid)
+                payable.append(row['id'])
+                entries.append(LedgerEntry(
+                    association_id=association_id, kind='invoice_payment',
+                    amount=paid, invoice_id=row['id'],
+                    description=row['description']))
+                results.append({"id": row['id'], "status": "paid",
+                                "amount": row['amount'],
+                                "penalty": current_penalty})
+
+            if payable:
+                cls.objects.filter(pk__in=payable).update(
+                    is_paid=True, payment_date=today,
+                    payment_accepted_by=accepted_by, penalty=penalty)
+                LedgerEntry.post(entries)
+                for code, (count, total) in collected.items():
+                    InvoiceGroup.bump(code, paid_count=count,
+                                      total_collected=total)
+                Household.invalidate_statements(
+                    row['household_id'] for row in rows)
+
+        if requested_ids is not None:
+            found = {row['id'] for row in rows}
+            results.extend({"id": invoice_id, "status": "not_found"}
+                           for invoice_id in requested_ids
+                           if invoice_id not in found)
+
+        return {
+            "updated": len(payable),
+            "paid_amount": sum(income.values(), Decimal(0)),
+            "results": results,
+        }
+
+    @classmethod
+    def delete_unpaid(cls, invoices, requested_ids=None):
+        """
+        Delete the unpaid invoices of the `invoices` queryset in one transaction.
+
+        Paid invoices are kept. The amount owed on the deleted invoices
+        (amount plus current penalty) is computed with one grouped aggregate,
+        which also feeds the group counters, and the rows are removed with a
+        single DELETE.
+
+        Args:
+            invoices (QuerySet): The invoices to delete.
+            requested_ids (iterable): Ids the caller asked for; the ones that
+                are not part of `invoices` are reported as `not_found`.
+
+        Returns:
+            dict: `deleted`, `deleted_amount`, the deleted ids and the skipped
+                  ids with the reason they were kept.
+        """
+        today = date.today()
+        with transaction.atomic():
+            rows = list(invoices.select_for_update(of=('self',))
+                        .order_by('id').values('id', 'is_paid', 'household_id',
+                                               'household__Association_id'))
+            deletable = [row['id'] for row in rows if not row['is_paid']]
+            skipped = [{"id": row['id'], "reason": "already_paid"}
+                       for row in rows if row['is_paid']]
+
+            deleted_amount = Decimal(0)
+            if deletable:
+                doomed = cls.objects.filter(pk__in=deletable)
+                groups = (doomed.annotate(current_penalty=doomed.penalty_expression(today))
+                          .order_by().values('group')
+                          .annotate(count=Count('id'), billed=Sum('amount'),
+                                    owed=Sum(F('amount') + F('current_penalty'))))
+                groups = list(groups)
+                doomed.delete()
+                for group in groups:
+                    deleted_amount += Decimal(group['owed']).quantize(Decimal('0.01'))
+                    InvoiceGroup.bump(group['group'], invoice_count=-group['count'],
+                                      total_billed=-group['billed'])
+                Association.bump_version(
+                    row['household__Association_id'] for row in rows)
+                Household.invalidate_statements(
+                    row['household_id'] for row in rows if not row['is_paid'])
+
+        if requested_ids is not None:
+            found = {row['id'] for row in rows}
+            skipped.extend({"id": invoice_id, "reason": "not_found"}
+                           for invoice_id in requested_ids
+                           if invoice_id not in found)
+
+        return {
+            "deleted": len(deletable),
+            "deleted_amount": deleted_amount,
+            "deleted_ids": deletable,
+            "skipped": skipped,
+        }
 
     def __str__(self):
         return f"Invoice {self.id} for {self.household}"
 
 
+class ReceivablesAgingSnapshot(models.Model):
+    """Daily copy of `InvoiceQuerySet.aging` so trends never rescan invoices."""
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="aging_snapshots")
+    snapshot_date = models.DateField()
+    building_no = models.CharField(max_length=100)
+    bucket = models.CharField(max_length=10, choices=Invoice.AGING_BUCKETS)
+    invoice_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    penalty = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['association', 'snapshot_date', 'building_no', 'bucket'],
+                name='unique_aging_snapshot_row'),
+        ]
+
+    @classmethod
+    def take(cls, today=None, association=None):
+        """
+        Store today's aging report, replacing a snapshot taken earlier that day.
+
+        Returns:
+            int: The number of snapshot rows written.
+        """
+        today = today or date.today()
+        invoices = Invoice.objects.all()
+        snapshots = cls.objects.filter(snapshot_date=today)
+        if association is not None:
+            invoices = invoices.filter(household__Association=association)
+            snapshots = snapshots.filter(association=association)
+
+        rows = [
+            cls(association_id=row['household__Association_id'],
+                snapshot_date=today,
+                building_no=row['household__building_no'],
+                bucket=row['bucket'],
+                invoice_count=row['invoice_count'],
+                amount=row['amount'],
+                penalty=row['penalty'])
+            for row in invoices.aging(today)
+        ]
+        with transaction.atomic():
+            snapshots.delete()
+            cls.objects.bulk_create(rows, batch_size=500)
+        return len(rows)
+
+    def __str__(self):
+        return f"{self.association} {self.snapshot_date} {self.building_no} {self.bucket}"
+
+
 class FinancialTransaction(models.Model):
     TRANSACTION_TYPES = (
         ('income', 'Income'),
@@ -208,44 +1153,192 @@ class FinancialTransaction(models.Model):
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     reason = models.TextField()
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=now)
     association = models.ForeignKey(
         Association, on_delete=models.CASCADE, related_name="transactions")
     accessed_by = models.CharField(max_length=50, null=True)
+    # Set for rows imported from a bank statement, to skip them next time
+    import_hash = models.CharField(max_length=64, null=True, blank=True)
 
-    def save(self, created_i=True, *args, **kwargs):
-        """Override save to adjust financial summary when transaction is saved."""
-        super().save(*args, **kwargs)
-
-        # Update financial summary based on transaction type
-        # Assume a single record for simplicity
-        financial_summary = FinancialSummary.objects.filter(
-            Association=self.association).first()
-        print(financial_summary, self.association)
-        if financial_summary and created_i:
-            if self.type == 'income':
-                financial_summary.add_income(self.amount)
-            elif self.type == 'expense':
-                financial_summary.deduct_expense(self.amount)
-
-    def delete(self, *args, **kwargs):
-        """Override delete to adjust financial summary when transaction is deleted."""
-        financial_summary = FinancialSummary.objects.filter(
-            Association=self.association).first()
+    class Meta:
+        indexes = [
+            models.Index(fields=['association', 'date'],
+                         name='fintxn_association_date_idx'),
+            models.Index(fields=['association', 'type', 'date'],
+                         name='fintxn_assoc_type_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['association', 'import_hash'],
+                                    name='unique_transaction_import'),
+        ]
+
+    @staticmethod
+    def signed_amount(type, amount):
+        """Return the change a transaction of `type` makes to the balance."""
+        amount = Decimal(amount)
+        return amount if type == 'income' else -amount
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was posted to the ledger so save() can post the change
+        stored = dict(zip(field_names, values))
+        if 'type' in stored and 'amount' in stored:
+            instance._posted = (stored['type'], stored['amount'])
+        return instance
 
-        if financial_summary:
-            if self.type == 'income':
-                financial_summary.deduct_income(self.amount)
-            elif self.type == 'expense':
-                financial_summary.add_expense(self.amount)
+    def save(self, *args, **kwargs):
+        """
+        Save the transaction and post its effect on the balance to the ledger.
+
+        A new transaction posts its amount; changing the type or amount of an
+        existing one posts a reversal of the old values and the new ones.
+        Expenses may not take the balance below zero.
+        """
+        created = self._state.adding
+        posted = getattr(self, '_posted', None)
+        if posted is None and not created:
+            # type or amount was deferred when the transaction was loaded
+            posted = FinancialTransaction.objects.filter(pk=self.pk).values_list(
+                'type', 'amount').first()
+        current = (self.type, Decimal(self.amount))
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            entries = []
+            if not created and posted is not None and posted != current:
+                entries.append(LedgerEntry(
+                    association_id=self.association_id, kind='reversal',
+                    amount=-self.signed_amount(*posted),
+                    financial_transaction=self, description=self.reason))
+            if created or entries:
+                entries.append(LedgerEntry(
+                    association_id=self.association_id, kind=self.type,
+                    amount=self.signed_amount(*current),
+                    financial_transaction=self, description=self.reason))
+                LedgerEntry.post(entries,
+                                 require_funds=self.type == 'expense')
+        self._posted = current
+
+    @staticmethod
+    def statement_hash(day, type, amount, reason):
+        """Identify a bank statement line by its date, signed amount and reason."""
+        signed = FinancialTransaction.signed_amount(type, amount)
+        key = f"{day.isoformat()}|{signed:.2f}|{' '.join(reason.split()).lower()}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def import_statement(cls, association, rows, accessed_by="", chunk_size=500):
+        """
+        Import parsed bank statement `rows` as transactions in one transaction.
+
+        Lines already imported, or repeated within the statement, are skipped
+        by their `statement_hash`. The new rows are inserted with
+        `bulk_create` and posted to the ledger together, so the balance moves
+        once by the net amount.
+
+        Args:
+            association (Association): The association the statement belongs to.
+            rows (list): Dicts with `line`, `date`, `type`, `amount` and `reason`.
+            accessed_by (str): Name stored in `accessed_by`.
+
+        Returns:
+            dict: `imported`, `net_amount` and the `duplicates` line numbers.
+
+        Raises:
+            ValueError: If the net amount would take the balance below zero.
+        """
+        for row in rows:
+            row["hash"] = cls.statement_hash(
+                row["date"], row["type"], row["amount"], row["reason"])
+
+        with transaction.atomic():
+            hashes = [row["hash"] for row in rows]
+            seen = set()
+            for start in range(0, len(hashes), chunk_size):
+                seen.update(cls.objects.filter(
+                    association=association,
+                    import_hash__in=hashes[start:start + chunk_size],
+                ).values_list('import_hash', flat=True))
+
+            duplicates = []
+            transactions = []
+            for row in rows:
+                if row["hash"] in seen:
+                    duplicates.append(row["line"])
+                    continue
+                seen.add(row["hash"])
+                transactions.append(cls(
+                    association=association, type=row["type"],
+                    amount=row["amount"], reason=row["reason"],
+                    date=make_aware(datetime.combine(row["date"], time.min)),
+                    accessed_by=accessed_by, import_hash=row["hash"]))
+
+            cls.objects.bulk_create(transactions, batch_size=chunk_size)
+            LedgerEntry.post([
+                LedgerEntry(
+                    association=association, kind=txn.type,
+                    amount=cls.signed_amount(txn.type, txn.amount),
+                    financial_transaction_id=txn.pk, description=txn.reason,
+                    occurred_at=txn.date)
+                for txn in transactions
+            ], require_funds=True)
+
+        return {
+            "imported": len(transactions),
+            "net_amount": sum((cls.signed_amount(txn.type, txn.amount)
+                               for txn in transactions), Decimal(0)),
+            "duplicates": duplicates,
+        }
 
-        # Call the parent delete method
-        super().delete(*args, **kwargs)
+    def delete(self, *args, **kwargs):
+        """Override delete to post a reversal of the transaction to the ledger."""
+        posted = getattr(self, '_posted', None) or (self.type, self.amount)
+        with transaction.atomic():
+            LedgerEntry.post([LedgerEntry(
+                association_id=self.association_id, kind='reversal',
+                amount=-self.signed_amount(*posted),
+                financial_transaction_id=self.pk, description=self.reason)])
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.type.capitalize()} - {self.amount}"
 
 
+@receiver(post_save, sender=Household)
+@receiver(post_delete, sender=Household)
+def bump_household_version(sender, instance, **kwargs):
+    Association.bump_version([instance.Association_id])
+
+
+@receiver(pre_delete, sender=Household)
+def detach_household_invoices(sender, instance, **kwargs):
+    # The invoices are cascaded away with a bulk DELETE
+    Invoice.detach(instance.invoices.all())
+
+
+@receiver(post_save, sender=FinancialSummary)
+def bump_summary_version(sender, instance, **kwargs):
+    Association.bump_version([instance.Association_id])
+
+
+@receiver(post_save, sender=FinancialTransaction)
+@receiver(post_delete, sender=FinancialTransaction)
+def bump_transaction_version(sender, instance, **kwargs):
+    Association.bump_version([instance.association_id])
+
+
+@receiver(post_save, sender=HouseholdMember)
+@receiver(post_delete, sender=HouseholdMember)
+@receiver(post_save, sender=Invoice)
+def bump_member_or_invoice_version(sender, instance, **kwargs):
+    # Invoices have no delete receiver: it would turn bulk deletes into
+    # row-by-row deletes. Every delete path bumps the version itself, bulk
+    # ones through Invoice.detach.
+    Association.objects.filter(household__pk=instance.household_id).update(
+        data_version=F('data_version') + 1)
+
+
 # Event Model
 class Event(models.Model):
     name = models.CharField(max_length=200)
@@ -258,51 +1351,289 @@ class Event(models.Model):
     created_by = models.CharField(max_length=50, default="")
     penalty_price = models.PositiveIntegerField(
         default=0)  # Total penalty price for this event
+    # Set by close(), once the penalties of the event were invoiced
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Set once the attendance sheet was moved to EventAttendanceArchive
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
-    def create_attendance_records(self):
-        """Create EventAttendance records for all households in the associated association."""
-        households = Household.objects.filter(Association=self.association)
-        for household in households:
-            EventAttendance.objects.create(
-                household=household,
-                event=self,
-                attended=False,
-                late_minutes=0,
-                entry_time=None,
-                exit_time=None,
-                penalty_amount=0  # Initial penalty amount is set to 0
-            )
-
-    def calculate_penalty_and_generate_invoices(self, created_by=""):
-        """Calculate and set penalties for all attendees and create invoices for applicable penalties."""
-        for attendance in EventAttendance.objects.filter(event=self):
-            penalty = attendance.calculate_penalty(
-                self.start_time, self.end_time)
-            if penalty > 0:
-                # Save the penalty amount on the EventAttendance record
+    def attendance_sheet(self):
+        """Return the attendance records of this event, archived or not."""
+        model = EventAttendanceArchive if self.archived_at else EventAttendance
+        return model.objects.filter(event=self)
+
+    def create_attendance_records(self, chunk_size=1000):
+        """
+        Create EventAttendance records for all households in the associated association.
+
+        Household ids are read with a single `values_list` and the records
+        are inserted with `bulk_create` in chunks of `chunk_size`. Households
+        that already have a record are skipped, so this is safe to run again.
+        """
+        household_ids = iter(Household.objects.filter(
+            Association_id=self.association_id).order_by('id').values_list('id', flat=True))
+        with transaction.atomic():
+            while True:
+                chunk = [
+                    EventAttendance(household_id=household_id, event=self)
+                    for household_id in islice(household_ids, chunk_size)
+                ]
+                if not chunk:
+                    break
+                EventAttendance.objects.bulk_create(chunk, ignore_conflicts=True)
+
+    @property
+    def invoice_group(self):
+        """Code of the invoice group the penalties of this event are issued under."""
+        return f"event-{self.pk}"
+
+    def close(self, created_by="", chunk_size=500):
+        """
+        Calculate the penalties of all attendees and invoice them.
+
+        The attendance sheet is read once, every penalty is computed in one
+        pass and stored with `bulk_update`, and the invoices are issued with
+        `Invoice.issue` under the event's own group. The event is then
+        marked with `closed_at`; an event closed before is left untouched, so
+        closing is idempotent.
+
+        Returns:
+            dict: `closed` (False when it was closed before) and the summary
+                  of the issued invoice group.
+        """
+        with transaction.atomic():
+            # Serialize concurrent closes of the same event
+            closed_at = Event.objects.select_for_update().filter(pk=self.pk).values_list(
+                'closed_at', flat=True).first()
+            if closed_at:
+                self.closed_at = closed_at
+                return {"closed": False, "group": self.invoice_group}
+
+            attendances = list(EventAttendance.objects.filter(event=self))
+            items = []
+            for attendance in attendances:
+                penalty, late_minutes = attendance.calculate_penalty(self)
                 attendance.penalty_amount = penalty
-                attendance.save()
-
-                # Create an invoice for penalties only if greater than 0
-                Invoice.objects.create(
-                    household=attendance.household,
-                    amount=penalty,
-                    created_by=created_by,
-                    description=f"Penalty for event {self.name}",
-                    # Assume payment due 7 days after the event
-                    due_date=self.date + timedelta(days=14),
-                    issued_date=now()
-                )
+                attendance.late_minutes = late_minutes
+                if penalty > 0:
+                    items.append((attendance.household_id, Decimal(penalty)))
+            EventAttendance.objects.bulk_update(
+                attendances, ['penalty_amount', 'late_minutes'], batch_size=chunk_size)
+
+            ParticipationStats.record(self)
+
+            summary = Invoice.issue(
+                self.association, items,
+                description=f"Penalty for event {self.name}",
+                # Payment is due 14 days after the event
+                due_date=self.date + timedelta(days=14),
+                created_by=created_by, group=self.invoice_group,
+                chunk_size=chunk_size)
+
+            self.closed_at = now()
+            self.save(update_fields=["closed_at"])
+        return {"closed": True, **summary}
+
+    def check_in(self, attendance_ids, at=None):
+        """
+        Record the entry of the `attendance_ids` of this event with one UPDATE.
+
+        A household checking in again starts over, so its exit is cleared.
+
+        Returns:
+            list: The ids of the attendance records changed.
+        """
+        with transaction.atomic():
+            changed = list(EventAttendance.objects.select_for_update().filter(
+                event=self, pk__in=attendance_ids).values_list('pk', flat=True))
+            EventAttendance.objects.filter(pk__in=changed).update(
+                entry_time=at or now(), exit_time=None)
+        return changed
+
+    def check_out(self, attendance_ids, at=None):
+        """
+        Record the exit of the `attendance_ids` of this event with one UPDATE.
+
+        Records with an exit already are left alone, so scanning again
+        changes nothing; the others are marked as attended when they have
+        an entry.
+
+        Returns:
+            list: The ids of the attendance records changed.
+        """
+        with transaction.atomic():
+            changed = list(EventAttendance.objects.select_for_update().filter(
+                event=self, pk__in=attendance_ids, exit_time__isnull=True,
+            ).values_list('pk', flat=True))
+            EventAttendance.objects.filter(pk__in=changed).update(
+                exit_time=at or now(),
+                attended=Case(When(entry_time__isnull=False, then=Value(True)),
+                              default=F('attended')))
+        return changed
+
+    def sync_scans(self, scans, chunk_size=500):
+        """
+        Apply an ordered batch of client-stamped scans in one transaction.
+
+        Every scan is recorded as an `AttendanceScan` under its idempotency
+        `key`, so a batch sent again after a lost response changes nothing.
+        The affected records are read once, the scans are replayed on them in
+        order with the client timestamps, and the result is stored with
+        `bulk_update`. A scan older than the last time already recorded on
+        its record is kept but not applied, so a device syncing late cannot
+        undo a newer scan; nor is a check-out of a record that has left.
+
+        Args:
+            scans (list): Dicts with `key`, `type` ("check_in" or
+                "check_out"), `attendance_id` and the aware datetime `at`.
+
+        Returns:
+            dict: The number of `applied` scans, the keys of the `duplicates`,
+                  `stale` and `unknown` scans, and the `attendance_ids` changed.
+        """
+        with transaction.atomic():
+            # Serialize concurrent syncs of the same event
+            list(Event.objects.select_for_update().filter(pk=self.pk))
+            keys = [scan["key"] for scan in scans]
+            seen = set()
+            for start in range(0, len(keys), chunk_size):
+                seen.update(AttendanceScan.objects.filter(
+                    event=self, key__in=keys[start:start + chunk_size],
+                ).values_list('key', flat=True))
+
+            records = {}
+            attendance_ids = list({scan["attendance_id"] for scan in scans})
+            for start in range(0, len(attendance_ids), chunk_size):
+                records.update(EventAttendance.objects.in_bulk(
+                    attendance_ids[start:start + chunk_size]))
+
+            duplicates, stale, unknown = [], [], []
+            recorded, changed, entries = [], set(), []
+            applied = 0
+            for scan in scans:
+                record = records.get(scan["attendance_id"])
+                if scan["key"] in seen:
+                    duplicates.append(scan["key"])
+                    continue
+                if record is None or record.event_id != self.pk:
+                    unknown.append(scan["key"])
+                    continue
+                seen.add(scan["key"])
+                recorded.append(AttendanceScan(
+                    event=self, attendance=record, key=scan["key"],
+                    type=scan["type"], scanned_at=scan["at"]))
+
+                latest = max(filter(None, (record.entry_time, record.exit_time)), default=None)
+                if latest and scan["at"] < latest:
+                    stale.append(scan["key"])
+                elif scan["type"] == "check_in":
+                    record.entry_time, record.exit_time = scan["at"], None
+                    changed.add(record.pk)
+                    entries.append(scan["at"])
+                    applied += 1
+                elif not record.exit_time:
+                    # Same rules as check_out: the first exit is kept
+                    record.exit_time = scan["at"]
+                    record.attended = record.attended or record.entry_time is not None
+                    changed.add(record.pk)
+                    applied += 1
+
+            AttendanceScan.objects.bulk_create(recorded, batch_size=chunk_size)
+            EventAttendance.objects.bulk_update(
+                [records[pk] for pk in changed],
+                ['entry_time', 'exit_time', 'attended'], batch_size=chunk_size)
+
+            # The first entry starts the event, as it does at the gate
+            if entries and not self.start_time:
+                self.start_time = localtime(min(entries)).time()
+                self.save(update_fields=["start_time"])
+
+        return {
+            "applied": applied,
+            "duplicates": duplicates,
+            "stale": stale,
+            "unknown": unknown,
+            "attendance_ids": sorted(changed),
+        }
+
+    def archive(self, chunk_size=1000):
+        """
+        Move the attendance sheet of this event to `EventAttendanceArchive`.
+
+        The rows are copied in chunks of `chunk_size` with their ids, removed
+        from the live table with one DELETE and the event is marked with
+        `archived_at`, all in one transaction. Archiving again does nothing.
+
+        Returns:
+            int: The number of attendance records archived.
+        """
+        fields = ['id', 'household_id', 'attended', 'late_minutes',
+                  'entry_time', 'exit_time', 'penalty_amount']
+        with transaction.atomic():
+            locked = Event.objects.select_for_update().filter(pk=self.pk).values_list(
+                'archived_at', flat=True).first()
+            if locked:
+                self.archived_at = locked
+                return 0
+
+            rows = iter(EventAttendance.objects.filter(event=self).order_by('id')
+                        .values_list(*fields).iterator(chunk_size=chunk_size))
+            archived = 0
+            while True:
+                chunk = [EventAttendanceArchive(event=self, **dict(zip(fields, row)))
+                         for row in islice(rows, chunk_size)]
+                if not chunk:
+                    break
+                EventAttendanceArchive.objects.bulk_create(chunk)
+                archived += len(chunk)
+            EventAttendance.objects.filter(event=self).delete()
+
+            self.archived_at = now()
+            self.save(update_fields=["archived_at"])
+        return archived
+
+    @classmethod
+    def archive_older_than(cls, days, association=None, chunk_size=1000):
+        """
+        Archive the closed events held more than `days` days ago.
+
+        Every event is archived in its own transaction, so the live table is
+        never locked for long. Events that were never closed keep their sheet
+        in the live table until they are.
+
+        Returns:
+            dict: The number of `events` and attendance `records` archived.
+        """
+        events = cls.objects.filter(
+            date__lt=localdate() - timedelta(days=days), archived_at__isnull=True,
+            closed_at__isnull=False).order_by('date')
+        if association is not None:
+            events = events.filter(association=association)
+
+        summary = {"events": 0, "records": 0}
+        for event in events:
+            summary["records"] += event.archive(chunk_size=chunk_size)
+            summary["events"] += 1
+        return summary
+
+    def attendance_counts(self):
+        """Return the number of attended and absent records with one query."""
+        return EventAttendance.objects.filter(event=self).aggregate(
+            attended_count=Count('id', filter=Q(attended=True)),
+            absent_count=Count('id', filter=Q(attended=False)))
 
     def delete(self, *args, **kwargs):
         """Override delete to delete associated attendance records."""
-        eventattendance = EventAttendance.objects.filter(event=self)
-        for attendance in eventattendance:
-            attendance.delete()
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            if self.closed_at:
+                # Take the closed event back out of the participation stats
+                ParticipationStats.record(self, sign=-1)
+            eventattendance = EventAttendance.objects.filter(event=self)
+            for attendance in eventattendance:
+                attendance.delete()
+            super().delete(*args, **kwargs)
 
         # Round the total penalty to the nearest 25 (only if needed)
 
@@ -317,43 +1648,232 @@ class EventAttendance(models.Model):
     penalty_amount = models.DecimalField(
         max_digits=10, decimal_places=2, default=0.0)
 
-    def calculate_penalty(self, event_start_time, event_end_time):
-        """Calculate the penalty based on attendance and lateness."""
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'attended'],
+                         name='attendance_event_attended_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'household'],
+                                    name='unique_event_household'),
+        ]
+
+    def calculate_penalty(self, event):
+        """
+        Calculate the penalty based on attendance and lateness.
+
+        Nothing is saved; `event` is passed in so a whole attendance sheet
+        can be processed without reloading it.
+
+        Returns:
+            tuple: The penalty, rounded to the nearest 25, and the minutes
+                   missed by arriving late or leaving early.
+        """
         penalty = 0
-        event_duration = (datetime.combine(date.today(), event_end_time) - datetime.combine(
-            date.today(), event_start_time)).total_seconds() / 60  # Minutes
-
-        late_minutes = 0
-        early_exit_minutes = 0
+        missed_minutes = 0
 
         if not self.attended:
-            penalty = self.event.penalty_price  # Full penalty for absence
+            penalty = event.penalty_price  # Full penalty for absence
         elif (not self.entry_time and self.exit_time) or (not self.exit_time and self.entry_time):
-            penalty = self.event.penalty_price / 2  # Half penalty for partial attendance
-
-        else:
-            if self.entry_time and self.entry_time > datetime.combine(date.today(), event_start_time):
-                late_minutes = (
-                    self.entry_time - datetime.combine(date.today(), event_start_time)).total_seconds() / 60
-                # Calculate late penalty as a percentage of total event time
-                penalty = round((late_minutes / event_duration)
-                                * self.event.penalty_price, 2)
-            elif self.exit_time and self.exit_time < datetime.combine(date.today(), event_end_time):
-                early_exit_minutes = (datetime.combine(
-                    date.today(), event_end_time) - self.exit_time).total_seconds() / 60
-                penalty += round((early_exit_minutes / event_duration)
-                                 * self.event.penalty_price, 2)
+            penalty = event.penalty_price / 2  # Half penalty for partial attendance
+        elif event.start_time and event.end_time:
+            start = make_aware(datetime.combine(event.date, event.start_time))
+            end = make_aware(datetime.combine(event.date, event.end_time))
+            event_duration = (end - start).total_seconds() / 60  # Minutes
+
+            if self.entry_time > start:
+                missed_minutes = (self.entry_time - start).total_seconds() / 60
+            elif self.exit_time < end:
+                missed_minutes = (end - self.exit_time).total_seconds() / 60
+            if event_duration > 0:
+                # Late penalty as a percentage of total event time
+                penalty = round((missed_minutes / event_duration)
+                                * event.penalty_price, 2)
 
         # Ensure the penalty is rounded to the nearest 25
         penalty = round(penalty / 25) * 25
-        self.late_minutes = late_minutes + early_exit_minutes
-        self.save()
-        return penalty
+        return penalty, int(missed_minutes)
 
     def __str__(self):
         return f"{self.id} {self.household} - {self.event}"
 
 
+class EventAttendanceArchive(models.Model):
+    """
+    Attendance record of an archived event.
+
+    `Event.archive` moves the sheets of old events here, keeping their ids,
+    so the live `EventAttendance` table only holds recent events.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    household = models.ForeignKey(Household, on_delete=models.CASCADE, related_name="+")
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="+")
+    attended = models.BooleanField(default=False)
+    late_minutes = models.PositiveIntegerField(default=0)
+    entry_time = models.DateTimeField(null=True, blank=True)
+    exit_time = models.DateTimeField(null=True, blank=True)
+    penalty_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.id} {self.household} - {self.event} (archived)"
+
+
+class ParticipationStats(models.Model):
+    """
+    Participation of a household in the closed events of one year.
+
+    The rows are updated by `Event.close`, so rankings read one row per
+    household instead of aggregating the attendance sheets.
+    """
+    household = models.ForeignKey(
+        Household, on_delete=models.CASCADE, related_name="participation_stats")
+    association = models.ForeignKey(
+        Association, on_delete=models.CASCADE, related_name="participation_stats")
+    year = models.PositiveSmallIntegerField()
+    event_count = models.IntegerField(default=0)
+    attended_count = models.IntegerField(default=0)
+    late_minutes = models.IntegerField(default=0)
+    penalty_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['household', 'year'],
+                                    name='unique_participation_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['association', 'year'],
+                         name='participation_assoc_year_idx'),
+        ]
+
+    @classmethod
+    def record(cls, event, sign=1):
+        """
+        Add the attendance sheet of a closed `event` to the stats of its year.
+
+        Missing rows are inserted with `ignore_conflicts` and all of them are
+        then incremented by one UPDATE that reads each household's record of
+        the event, so concurrent closes of different events can't lose
+        counts. `sign=-1` takes the event back out.
+        """
+        attendances = event.attendance_sheet()
+        cls.objects.bulk_create([
+            cls(household_id=household_id, association_id=event.association_id,
+                year=event.date.year)
+            for household_id in attendances.values_list('household_id', flat=True)
+        ], batch_size=500, ignore_conflicts=True)
+
+        own = attendances.filter(household=models.OuterRef('household'))
+        cls.objects.filter(
+            year=event.date.year,
+            household__in=attendances.values('household_id'),
+        ).update(
+            event_count=F('event_count') + sign,
+            attended_count=F('attended_count') + sign * models.Subquery(own.values(
+                count=Case(When(attended=True, then=Value(1)), default=Value(0)))),
+            late_minutes=F('late_minutes') + sign * models.Subquery(own.values('late_minutes')),
+            penalty_total=F('penalty_total') + sign * models.Subquery(own.values('penalty_amount')),
+        )
+
+    @classmethod
+    def rebuild(cls, association=None):
+        """
+        Recompute the stats from the attendance sheets of the closed events.
+
+        Returns:
+            int: The number of stats rows written.
+        """
+        attendances = EventAttendance.objects.filter(event__closed_at__isnull=False)
+        archived = EventAttendanceArchive.objects.filter(event__closed_at__isnull=False)
+        stats = cls.objects.all()
+        if association is not None:
+            attendances = attendances.filter(event__association=association)
+            archived = archived.filter(event__association=association)
+            stats = stats.filter(association=association)
+
+        totals = {}
+        for sheet in (attendances, archived):
+            grouped = (sheet.annotate(year=ExtractYear('event__date'))
+                       .order_by().values('household_id', 'event__association_id', 'year')
+                       .annotate(event_count=Count('id'),
+                                 attended_count=Count('id', filter=Q(attended=True)),
+                                 late_minutes=Sum('late_minutes'),
+                                 penalty_total=Sum('penalty_amount')))
+            for row in grouped:
+                key = (row['household_id'], row['event__association_id'], row['year'])
+                total = totals.setdefault(key, [0, 0, 0, Decimal(0)])
+                total[0] += row['event_count']
+                total[1] += row['attended_count']
+                total[2] += row['late_minutes']
+                total[3] += row['penalty_total']
+        rows = [
+            cls(household_id=household_id, association_id=association_id, year=year,
+                event_count=event_count, attended_count=attended_count,
+                late_minutes=late_minutes, penalty_total=penalty_total)
+            for (household_id, association_id, year),
+            (event_count, attended_count, late_minutes, penalty_total) in totals.items()
+        ]
+        with transaction.atomic():
+            stats.delete()
+            cls.objects.bulk_create(rows, batch_size=500)
+        return len(rows)
+
+    @classmethod
+    def ranking(cls, association, year, order="attendance"):
+        """
+        Rank the households of `association` for `year` in one query.
+
+        `order` is "attendance" (highest rate first, then least late),
+        "lateness" (most late minutes per attended event first) or "penalty"
+        (highest total first). Raises ValueError for any other order.
+        """
+        orders = {
+            "attendance": [F('attendance_rate').desc(nulls_last=True),
+                           F('average_late_minutes').asc(nulls_last=True)],
+            "lateness": [F('average_late_minutes').desc(nulls_last=True)],
+            "penalty": [F('penalty_total').desc()],
+        }
+        if order not in orders:
+            raise ValueError("Order must be 'attendance', 'lateness' or 'penalty'.")
+        return cls.objects.filter(association=association, year=year).annotate(
+            attendance_rate=Cast('attended_count', models.FloatField())
+            / NullIf('event_count', Value(0)),
+            average_late_minutes=Cast('late_minutes', models.FloatField())
+            / NullIf('attended_count', Value(0)),
+        ).annotate(
+            rank=Window(Rank(), order_by=orders[order]),
+        ).order_by(*orders[order], 'household_id')
+
+    def __str__(self):
+        return f"{self.household} {self.year}: {self.attended_count}/{self.event_count}"
+
+
+class AttendanceScan(models.Model):
+    """A check-in or check-out synced from a gate device, kept for idempotency."""
+    TYPE_CHOICES = (
+        ('check_in', 'Check in'),
+        ('check_out', 'Check out'),
+    )
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="scans")
+    # Archiving moves the sheet and keeps its ids, so the scans stay and still
+    # point at the same record without a constraint on the live table
+    attendance = models.ForeignKey(
+        EventAttendance, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    # Idempotency key chosen by the device
+    key = models.CharField(max_length=100)
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    scanned_at = models.DateTimeField()
+    received_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'key'],
+                                    name='unique_attendance_scan'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.type} - {self.attendance_id}"
+
+
 # Project Model
 class Project(models.Model):
     name = models.CharField(max_length=200)
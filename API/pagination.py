@@ -0,0 +1,126 @@
+import base64
+import json
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination.
+
+    Pages are read with `WHERE (ordering) > (last row)` instead of an OFFSET, so
+    every page costs the same regardless of how deep the client is. `ordering`
+    must end with a unique field (usually `id`) to make it stable.
+
+    Attributes:
+        ordering (tuple): Fields the queryset is ordered by, `-` for descending.
+        page_size (int): Default number of rows per page.
+        page_size_query_param (str): Query parameter to request another page size.
+        max_page_size (int): Upper bound for the requested page size.
+    """
+    ordering = ('-id',)
+    page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.next_position = None
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            self.next_position = [
+                getattr(last, field.lstrip('-')) for field in self.ordering]
+        return rows
+
+    def after(self, position):
+        """Build the filter matching the rows that come after `position`."""
+        condition = Q()
+        for index, field in reversed(list(enumerate(self.ordering))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            beyond = Q(**{f"{name}__{lookup}": position[index]})
+            if index == len(self.ordering) - 1:
+                condition = beyond
+            else:
+                condition = beyond | (Q(**{name: position[index]}) & condition)
+        # A plain range on the leading field lets the database seek to the
+        # cursor in the ordering index instead of walking up to it
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & condition
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def is_first_page(self):
+        return self.cursor_query_param not in self.request.query_params
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        # Full isoformat: a truncated timestamp would skip rows
+        data = json.dumps(position, default=lambda value: value.isoformat())
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class HouseholdPagination(KeysetPagination):
+    ordering = ('building_no', 'apartment_number', 'id')
+
+
+class HouseholdMemberPagination(KeysetPagination):
+    ordering = ('-current_member', 'name', 'id')
+
+
+class InvoicePagination(KeysetPagination):
+    ordering = ('-issued_date', '-id')
+
+
+class InvoiceGroupPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class FinancialTransactionPagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+class EventPagination(KeysetPagination):
+    ordering = ('-date', '-id')
@@ -0,0 +1,146 @@
+import re
+from django.db import connection, connections
+from django.db.models import Case, FloatField, Value, When
+
+
+# FTS5 indexes over the household and member tables. They are external
+# content tables: the text stays in the model tables, triggers keep the index
+# in step with every INSERT, UPDATE and DELETE (bulk ones included).
+INDEXES = {
+    'household_search': {
+        'table': 'API_household',
+        'columns': ['head_of_household', 'contact_number', 'apartment_number', 'building_no'],
+        'unindexed': ['Association_id'],
+        'association': ('', '"household_search"."Association_id"'),
+    },
+    'member_search': {
+        'table': 'API_householdmember',
+        'columns': ['name', 'contact_number'],
+        'unindexed': [],
+        # Members are scoped through their household
+        'association': (
+            'JOIN "API_householdmember" member ON member."id" = "member_search".rowid '
+            'JOIN "API_household" household ON household."id" = member."household_id"',
+            'household."Association_id"'),
+    },
+}
+
+WORD = re.compile(r'\w+')
+
+
+def is_available():
+    """The full-text indexes exist on SQLite only, other databases use `icontains`."""
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text):
+    """
+    Turn the text typed by a user into an FTS5 query.
+
+    Every word must match the start of a word of the row, so "abe keb"
+    finds "Abebe Kebede" while the user is still typing.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(text))
+
+
+def ranked_ids(index, text, association_id=None, limit=50, after=None):
+    """
+    Return one page of the rows of `index` matching `text`, best first.
+
+    Pages are read after the `(rank, id)` position of the last row of the
+    previous page, so every match can be reached however many there are.
+
+    Args:
+        index (str): `household_search` or `member_search`.
+        text (str): The search term.
+        association_id (int): Only return rows of this association.
+        limit (int): The number of rows returned at most.
+        after (list): The `(rank, id)` position to continue after.
+
+    Returns:
+        list: `(id, rank)` pairs ordered by bm25 rank, then id.
+    """
+    query = match_query(text)
+    if not query:
+        return []
+    join, association = INDEXES[index]['association']
+    sql = (f'SELECT "{index}".rowid, "{index}".rank FROM "{index}" {join} '
+           f'WHERE "{index}" MATCH %s')
+    params = [query]
+    if association_id is not None:
+        sql += f' AND {association} = %s'
+        params.append(association_id)
+    if after is not None:
+        sql += (f' AND ("{index}".rank > %s OR ("{index}".rank = %s '
+                f'AND "{index}".rowid > %s))')
+        params += [after[0], after[0], after[1]]
+    sql += f' ORDER BY "{index}".rank, "{index}".rowid LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def ranked(queryset, rows):
+    """
+    Limit `queryset` to the `(id, rank)` `rows` and annotate `search_rank`.
+
+    Keyset pagination on `('search_rank', 'id')` then keeps the bm25 order.
+    """
+    return queryset.filter(pk__in=[pk for pk, rank in rows]).annotate(search_rank=Case(
+        *[When(pk=pk, then=Value(rank)) for pk, rank in rows],
+        output_field=FloatField()))
+
+
+def install(using='default'):
+    """
+    Create the indexes and triggers that are missing, and refill those indexes.
+
+    Migrations that alter a model table on SQLite rebuild it and lose its
+    triggers, so this runs after every `migrate` (see `ApiConfig.ready`).
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for index, spec in INDEXES.items():
+            if spec['table'] not in existing:
+                continue
+            statements = create_sql(index)
+            names = [index, f"{index}_ai", f"{index}_ad", f"{index}_au"]
+            missing = [statement for name, statement in zip(names, statements)
+                       if name not in existing]
+            if missing:
+                for statement in missing + [rebuild_sql(index)]:
+                    cursor.execute(statement)
+
+
+def create_sql(index):
+    """Statements creating `index` and the triggers keeping it up to date."""
+    spec = INDEXES[index]
+    table, columns = spec['table'], spec['columns'] + spec['unindexed']
+    names = ', '.join(f'"{column}"' for column in columns)
+    definitions = ', '.join(
+        [f'"{column}"' for column in spec['columns']]
+        + [f'"{column}" UNINDEXED' for column in spec['unindexed']])
+    new = ', '.join(f'new."{column}"' for column in columns)
+    old = ', '.join(f'old."{column}"' for column in columns)
+    watched = ', '.join(f'"{column}"' for column in spec['columns'])
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{index}" USING fts5({definitions}, '
+        f"content='{table}', content_rowid='id', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS "{index}_ai" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{index}"(rowid, {names}) VALUES (new."id", {new}); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{index}_ad" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{index}"("{index}", rowid, {names}) VALUES (\'delete\', old."id", {old}); END',
+        f'CREATE TRIGGER IF NOT EXISTS "{index}_au" AFTER UPDATE OF {watched} ON "{table}" BEGIN '
+        f'INSERT INTO "{index}"("{index}", rowid, {names}) VALUES (\'delete\', old."id", {old}); '
+        f'INSERT INTO "{index}"(rowid, {names}) VALUES (new."id", {new}); END',
+    ]
+
+
+def rebuild_sql(index):
+    """Statement refilling `index` from its table."""
+    return f'INSERT INTO "{index}"("{index}") VALUES (\'rebuild\')'
@@ -7,6 +7,12 @@ from django.http import JsonResponse
 from decimal import Decimal
 
 
+def penalty_representation(invoice):
+    """Render the annotated (or stored) penalty of an invoice as `"12.00"`."""
+    penalty = getattr(invoice, 'current_penalty', invoice.penalty)
+    return str(Decimal(penalty).quantize(Decimal('0.01')))
+
+
 class HouseholdSerializer(serializers.ModelSerializer):
     class Meta:
         model = api_model.Household
@@ -90,8 +96,17 @@ class FinancialSummarySerializer(serializers.ModelSerializer):
         if 'add_income' in validated_data:
             instance.add_income(validated_data.pop('add_income'))
         if 'deduct_expense' in validated_data:
-            instance.deduct_expense(validated_data.pop('deduct_expense'))
-        return super().update(instance, validated_data)
+            try:
+                instance.deduct_expense(validated_data.pop('deduct_expense'))
+            except ValueError as error:
+                raise serializers.ValidationError(
+                    {'deduct_expense': str(error)})
+        # The balance is only moved through the ledger, never written back
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if validated_data:
+            instance.save(update_fields=list(validated_data))
+        return instance
 
 
 class InvoiceSerializer(serializers.ModelSerializer):
@@ -101,6 +116,7 @@ class InvoiceSerializer(serializers.ModelSerializer):
     due_date = serializers.DateField(format="%Y-%m-%d")
     # Custom fields for displaying status
     status = serializers.SerializerMethodField()
+    penalty = serializers.SerializerMethodField()
 
     class Meta:
         model = api_model.Invoice
@@ -132,12 +148,18 @@ class InvoiceSerializer(serializers.ModelSerializer):
 
     def get_status(self, obj):
         """Determine invoice status."""
+        if hasattr(obj, 'current_status'):
+            return obj.current_status
         if obj.is_paid:
             return "Paid"
         elif date.today() > obj.due_date:
             return "Overdue"
         return "Pending"
 
+    def get_penalty(self, obj):
+        """Prefer the penalty annotated by `Invoice.objects.with_penalty()`."""
+        return penalty_representation(obj)
+
     def validate_amount(self, value):
         """Ensure the amount is positive."""
         if value <= 0:
@@ -181,23 +203,37 @@ class InvoiceSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         """Handle custom logic during update."""
-        is_paid_previous = instance.is_paid
-        instance = super().update(instance, validated_data)
+        # save() recalculates the penalty and posts the payment to the
+        # ledger when the invoice becomes paid
+        return super().update(instance, validated_data)
 
-        # Recalculate penalty if invoice is updated
-        instance.calculate_penalty()
-        instance.save()
 
-        # Handle financial summary updates only if payment status changes
-        if not is_paid_previous and instance.is_paid:
-            from .models import FinancialSummary  # Import here to avoid circular imports
-            financial_summary = FinancialSummary.objects.filter(
-                Association=instance.household.Association).first()
-            if financial_summary:
-                financial_summary.add_income(
-                    instance.amount + instance.penalty)
+class InvoiceGroupSerializer(serializers.ModelSerializer):
+    # Share of paid invoices, for progress bars
+    progress = serializers.SerializerMethodField()
 
-        return instance
+    class Meta:
+        model = api_model.InvoiceGroup
+        fields = (
+            'id',
+            'code',
+            'description',
+            'due_date',
+            'created_by',
+            'created_at',
+            'invoice_count',
+            'paid_count',
+            'total_billed',
+            'total_collected',
+            'progress',
+        )
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Percentage of the group's invoices that are paid."""
+        if not obj.invoice_count:
+            return 0
+        return round(obj.paid_count * 100 / obj.invoice_count, 2)
 
 
 class InvoiceHomeSerializer(serializers.ModelSerializer):
@@ -206,6 +242,7 @@ class InvoiceHomeSerializer(serializers.ModelSerializer):
     due_date = serializers.DateField(format="%Y-%m-%d")
     # Custom fields for displaying status
     status = serializers.SerializerMethodField()
+    penalty = serializers.SerializerMethodField()
 
     class Meta:
         model = api_model.Invoice
@@ -227,19 +264,24 @@ class InvoiceHomeSerializer(serializers.ModelSerializer):
     def get_status(self, obj):
         """Determine invoice status."""
         from datetime import date  # Ensure the date module is imported
+        if hasattr(obj, 'current_status'):
+            return obj.current_status
         if obj.is_paid:
             return "Paid"
         elif date.today() > obj.due_date:
             return "Overdue"
         return "Pending"
 
+    def get_penalty(self, obj):
+        """Prefer the penalty annotated by `Invoice.objects.with_penalty()`."""
+        return penalty_representation(obj)
+
 
 class FinancialTransactionSerializer(serializers.ModelSerializer):
     type_display = serializers.CharField(
         source='get_type_display', read_only=True)
-    # Assuming the Association model has a `name` field
     association_name = serializers.CharField(
-        source='association.name', read_only=True)
+        source='association.place', read_only=True)
 
     class Meta:
         model = api_model.FinancialTransaction
@@ -254,7 +296,7 @@ class FinancialTransactionSerializer(serializers.ModelSerializer):
             'association_name',
             'accessed_by',
         ]
-        read_only_fields = ['type_display', 'association_name']
+        read_only_fields = ['type_display', 'date', 'association_name']
 
     def validate_amount(self, value):
         if value <= 0:
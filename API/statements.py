@@ -0,0 +1,83 @@
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|$)', re.S | re.I)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def parse_statement(content):
+    """
+    Parse a bank statement exported as CSV or OFX.
+
+    CSV statements need a header with `date` (YYYY-MM-DD), `amount` and
+    `reason` columns. The amount is signed (negative for expenses) unless a
+    `type` column says `income` or `expense`. OFX statements are read from
+    their `<STMTTRN>` blocks (`DTPOSTED`, `TRNAMT`, `NAME`/`MEMO`).
+
+    Args:
+        content (str): The text of the statement.
+
+    Returns:
+        tuple: The parsed rows, as dicts with `line`, `date`, `type`, `amount`
+               and `reason`, and the errors found, as dicts with `line` and
+               `error`. Every row is checked before anything is returned.
+    """
+    if '<STMTTRN>' in content.upper():
+        lines = [(number, _ofx_row(block))
+                 for number, block in enumerate(OFX_TRANSACTION.findall(content), 1)]
+    else:
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or not {'date', 'amount', 'reason'} <= {
+                name.strip().lower() for name in reader.fieldnames}:
+            return [], [{"line": 1, "error": "The header needs date, amount and reason columns."}]
+        lines = [(number, {key.strip().lower(): (value or "").strip()
+                           for key, value in row.items() if key})
+                 for number, row in enumerate(reader, 2)]
+
+    rows = []
+    errors = []
+    for number, raw in lines:
+        try:
+            rows.append({"line": number, **_clean_row(raw)})
+        except ValueError as error:
+            errors.append({"line": number, "error": str(error)})
+    return rows, errors
+
+
+def _ofx_row(block):
+    fields = {name.upper(): value.strip() for name, value in OFX_FIELD.findall(block)}
+    posted = fields.get('DTPOSTED', '')[:8]
+    return {
+        "date": f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) == 8 else posted,
+        "amount": fields.get('TRNAMT', ''),
+        "reason": fields.get('MEMO') or fields.get('NAME', ''),
+    }
+
+
+def _clean_row(raw):
+    try:
+        day = datetime.strptime(raw.get("date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Invalid date. Use 'YYYY-MM-DD'.")
+    try:
+        amount = Decimal(raw.get("amount", "").replace(",", "")).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError("Invalid amount.")
+
+    type = raw.get("type", "").lower()
+    if type:
+        if type not in ("income", "expense"):
+            raise ValueError("Type must be 'income' or 'expense'.")
+        amount = abs(amount)
+    else:
+        type = "income" if amount > 0 else "expense"
+        amount = abs(amount)
+    if amount == 0:
+        raise ValueError("Amount must be greater than zero.")
+    if not raw.get("reason"):
+        raise ValueError("Reason is required.")
+    return {"date": day, "type": type, "amount": amount, "reason": raw["reason"]}
@@ -1,3 +1,963 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import re
+import unittest
+from unittest import mock
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate, localtime, now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from API import live as api_live
+from API import models as api_model
+from API import views as api_views
+from API.admin import InvoiceAdmin
 
 # Create your tests here.
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "uses EXPLAIN QUERY PLAN")
+class QueryPlanTests(TestCase):
+    """
+    Run EXPLAIN on every query issued by the hot read views and fail if any of
+    them walks a whole table instead of searching an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Test place", building_numbers="1-3")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="committee", password="password", role="committee",
+            association=cls.association)
+        cls.households = [
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no=str(number % 3), head_of_household=f"Head {number}",
+                contact_number=f"0911{number:06d}")
+            for number in range(30)
+        ]
+        for household in cls.households:
+            api_model.HouseholdMember.objects.create(
+                household=household, name=household.head_of_household, age=40,
+                sex="female", role="head")
+        api_model.Invoice.issue(
+            cls.association,
+            [(household.pk, Decimal("100.00")) for household in cls.households],
+            "Monthly dues", date.today() + timedelta(days=10))
+        api_model.Invoice.objects.filter(
+            household__in=cls.households[:10]).update(
+            due_date=date.today() - timedelta(days=20))
+        api_model.FinancialTransaction.objects.create(
+            type="income", amount=Decimal("500.00"), reason="Donation",
+            association=cls.association)
+        cls.event = api_model.Event.objects.create(
+            name="General meeting", date=date.today(),
+            association=cls.association)
+        cls.event.create_attendance_records()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoFullScan(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                # The cache backend counts its rows on every set, there are
+                # at most MAX_ENTRIES of them
+                if '"cms_cache"' in query['sql']:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query['sql'])
+                details = [row[-1] for row in cursor.fetchall()]
+                # A page read in index order stops after LIMIT rows
+                paged = ' LIMIT ' in query['sql'] and not any(
+                    detail.startswith('USE TEMP B-TREE FOR ORDER BY') for detail in details)
+                for detail in details:
+                    if paged and re.match(r'SCAN \w+ USING (COVERING )?INDEX', detail):
+                        continue
+                    # Scanning a window function's materialized rows, or a
+                    # full-text index, is fine
+                    if re.match(r'SCAN (?!CONSTANT ROW|\(subquery-|\w+ VIRTUAL TABLE)', detail):
+                        self.fail(f"{url} scans a whole table ({detail}):\n{query['sql']}")
+
+    def test_household_views(self):
+        self.assertNoFullScan("/api/v1/household/")
+        self.assertNoFullScan("/api/v1/household/?search=Head")
+        self.assertNoFullScan("/api/v1/household/?search=Head 1")
+        self.assertNoFullScan("/api/v1/household/?search=0911")
+        self.assertNoFullScan(f"/api/v1/household/{self.households[0].pk}/")
+
+    def test_household_member_views(self):
+        self.assertNoFullScan("/api/v1/householdmember/")
+        self.assertNoFullScan("/api/v1/householdmember/?page_size=5")
+        self.assertNoFullScan(self.client.get("/api/v1/householdmember/?page_size=5").data["next"])
+        self.assertNoFullScan("/api/v1/householdmember/?search=Head")
+        self.assertNoFullScan(
+            f"/api/v1/householdmember/{self.households[0].members.get().pk}/")
+
+    def test_financial_views(self):
+        self.assertNoFullScan("/api/v1/FinTxn/")
+        self.assertNoFullScan("/api/v1/FinancialSummary/")
+        api_model.BalanceCheckpoint.rebuild(self.association)
+        self.assertNoFullScan("/api/v1/FinancialSummary/as-of/")
+        self.assertNoFullScan(
+            f"/api/v1/FinancialSummary/as-of/?date={date.today() - timedelta(days=40)}")
+        self.assertNoFullScan("/api/v1/FinancialSummary/monthly/?by=type")
+
+    def test_invoice_views(self):
+        self.assertNoFullScan("/api/v1/invoice/")
+        self.assertNoFullScan("/api/v1/invoice/?status=unpaid&due=1")
+        self.assertNoFullScan("/api/v1/invoice/groups/")
+        self.assertNoFullScan("/api/v1/invoice/aging/")
+        self.assertNoFullScan("/api/v1/invoice/aging/history/")
+        self.assertNoFullScan(f"/api/v1/invoice/house/{self.households[0].pk}/")
+
+    def test_event_views(self):
+        self.assertNoFullScan("/api/v1/event/")
+        self.assertNoFullScan(f"/api/v1/event/retrive/{self.event.pk}/")
+        self.event.close()
+        self.assertNoFullScan("/api/v1/event/participation/")
+        self.assertNoFullScan("/api/v1/event/participation/?order=penalty")
+
+    def test_archived_event_views(self):
+        event = api_model.Event.objects.create(
+            name="Last year's meeting", date=date.today() - timedelta(days=400),
+            association=self.association)
+        event.create_attendance_records()
+        event.close()
+        api_model.Event.archive_older_than(365)
+        self.assertFalse(api_model.EventAttendance.objects.filter(event=event).exists())
+        self.assertNoFullScan(f"/api/v1/event/retrive/{event.pk}/")
+
+
+class InvoicePenaltyTests(TestCase):
+    """The penalties computed by the database match `Invoice.calculate_penalty`."""
+
+    def test_penalty_expression_matches_calculate_penalty(self):
+        association = api_model.Association.objects.create(
+            place="Penalty place", building_numbers="1")
+        household = api_model.Household.objects.create(
+            Association=association, apartment_number="1", building_no="1",
+            head_of_household="Head", contact_number="0911000000")
+        amounts = [Decimal("0.01"), Decimal("12.25"), Decimal("99.99"),
+                   Decimal("100.00"), Decimal("1234.57"), Decimal("87654.33")]
+        # Every tier boundary, and a few days on each side of it
+        days = [-3, 0, 1, 2, 9, 10, 11, 12, 29, 30, 31, 32, 90, 365]
+        api_model.Invoice.objects.bulk_create([
+            api_model.Invoice(household=household, amount=amount, description="Dues",
+                              due_date=date.today() - timedelta(days=overdue))
+            for amount in amounts for overdue in days
+        ])
+
+        invoices = api_model.Invoice.objects.with_penalty()
+        self.assertEqual(len(invoices), len(amounts) * len(days))
+        for invoice in invoices:
+            self.assertEqual(invoice.current_penalty, invoice.calculate_penalty(),
+                             (invoice.amount, invoice.due_date))
+
+    def test_materialize_penalties_command(self):
+        association, other = [
+            api_model.Association.objects.create(place=place, building_numbers="1")
+            for place in ("Nightly place", "Other nightly place")]
+        household, other_household = [
+            api_model.Household.objects.create(
+                Association=owner, apartment_number="1", building_no="1",
+                head_of_household="Head", contact_number="0977000000")
+            for owner in (association, other)]
+        late = date.today() - timedelta(days=5)
+        overdue, moved, paid, elsewhere = api_model.Invoice.objects.bulk_create([
+            api_model.Invoice(household=household, amount=Decimal("100.00"),
+                              description="Dues", due_date=late),
+            # The due date was moved after a penalty had been stored
+            api_model.Invoice(household=household, amount=Decimal("100.00"),
+                              description="Dues", penalty=Decimal("6.00"),
+                              due_date=date.today() + timedelta(days=3)),
+            api_model.Invoice(household=household, amount=Decimal("100.00"),
+                              description="Dues", due_date=late, is_paid=True),
+            api_model.Invoice(household=other_household, amount=Decimal("100.00"),
+                              description="Dues", due_date=late),
+        ])
+        version = api_model.Association.objects.get(pk=association.pk).data_version
+
+        output = StringIO()
+        call_command('materialize_penalties', association=association.pk, chunk_size=1,
+                     stdout=output)
+        self.assertIn("Scanned 2 invoices, updated 2 penalties", output.getvalue())
+        penalties = dict(api_model.Invoice.objects.values_list('pk', 'penalty'))
+        self.assertEqual(
+            [penalties[invoice.pk] for invoice in (overdue, moved, paid, elsewhere)],
+            [Decimal("10.00"), Decimal("0.00"), Decimal("0.00"), Decimal("0.00")])
+        self.assertGreater(
+            api_model.Association.objects.get(pk=association.pk).data_version, version)
+
+        # Nothing is left to update
+        output = StringIO()
+        call_command('materialize_penalties', association=association.pk, stdout=output)
+        self.assertIn("Scanned 1 invoices, updated 0 penalties", output.getvalue())
+
+    def test_penalty_tiers(self):
+        self.assertEqual(api_model.Invoice.penalty_for(Decimal("100.00"), 10), Decimal("20.00"))
+        self.assertEqual(api_model.Invoice.penalty_for(Decimal("100.00"), 11), Decimal("24.00"))
+        self.assertEqual(api_model.Invoice.penalty_for(Decimal("100.00"), 31), Decimal("105.00"))
+        self.assertEqual(api_model.Invoice.penalty_for(Decimal("12.25"), 1), Decimal("0.25"))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "uses the FTS5 indexes")
+class SearchTests(TestCase):
+    """Full-text search is scoped to the user's association and pages through every match."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Search place", building_numbers="1-2")
+        other = api_model.Association.objects.create(
+            place="Other place", building_numbers="1")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="searcher", password="password", role="committee",
+            association=cls.association)
+        own = api_model.Household.objects.bulk_create([
+            api_model.Household(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Abebe {number}",
+                contact_number=f"0911{number:06d}")
+            for number in range(25)
+        ])
+        foreign = api_model.Household.objects.create(
+            Association=other, apartment_number="1", building_no="1",
+            head_of_household="Abebe Other", contact_number="0922000000")
+        api_model.HouseholdMember.objects.bulk_create(
+            [api_model.HouseholdMember(household=foreign, name=f"Abebe {number}",
+                                       age=30, sex="male", role="relative")
+             for number in range(60)]
+            + [api_model.HouseholdMember(household=own[0], name=f"Abebe Kebede {number}",
+                                         age=30, sex="male", role="child")
+               for number in range(3)])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_member_search_is_scoped_to_the_association(self):
+        response = self.client.get("/api/v1/householdmember/?search=abebe&page_size=10")
+        self.assertEqual(sorted(member["name"] for member in response.data["data"]),
+                         [f"Abebe Kebede {number}" for number in range(3)])
+
+    def test_household_search_pages_through_every_match(self):
+        url, seen = "/api/v1/household/?search=abe&page_size=10", []
+        while url:
+            response = self.client.get(url)
+            seen += [household["id"] for household in response.data["data"]]
+            url = response.data["next"]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+
+class ConditionalGetTests(TestCase):
+    """The ETag of an association's data changes whenever that data does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="ETag place", building_numbers="1")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="etag", password="password", role="committee",
+            association=cls.association)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNotModified(self, url, etag, expected):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304 if expected else 200)
+        return response
+
+    def test_summary_etag_changes_with_the_balance(self):
+        url = "/api/v1/FinancialSummary/"
+        etag = self.client.get(url)["ETag"]
+        self.assertNotModified(url, etag, True)
+
+        api_model.FinancialTransaction.objects.create(
+            type="income", amount=Decimal("40.00"), reason="Donation",
+            association=self.association)
+        etag = self.assertNotModified(url, etag, False)["ETag"]
+        self.assertNotModified(url, etag, True)
+
+        # A stored balance drifted away from the ledger and is repaired
+        api_model.FinancialSummary.objects.filter(
+            Association=self.association).update(total_balance=Decimal("1.00"))
+        api_model.FinancialSummary.repair(self.association.pk)
+        response = self.assertNotModified(url, etag, False)
+        self.assertEqual(Decimal(response.data["total_balance"]), Decimal("40.00"))
+
+    def test_invoice_list_etag_changes_when_invoices_change(self):
+        household = api_model.Household.objects.create(
+            Association=self.association, apartment_number="1", building_no="1",
+            head_of_household="Head", contact_number="0944000000")
+        url = "/api/v1/invoice/"
+        etag = self.client.get(url)["ETag"]
+
+        api_model.Invoice.issue(self.association, [(household.pk, Decimal("80.00"))],
+                                "Monthly dues", date.today() + timedelta(days=10))
+        etag = self.assertNotModified(url, etag, False)["ETag"]
+        self.assertNotModified(url, etag, True)
+
+        api_model.Invoice.settle(api_model.Invoice.objects.filter(household=household))
+        etag = self.assertNotModified(url, etag, False)["ETag"]
+        self.assertNotModified(url, etag, True)
+
+        # Deleted in bulk from the admin
+        InvoiceAdmin(api_model.Invoice, admin.site).delete_queryset(
+            None, api_model.Invoice.objects.filter(household=household))
+        etag = self.assertNotModified(url, etag, False)["ETag"]
+        self.assertNotModified(url, etag, True)
+
+        # Another association's changes keep this one's ETag
+        other = api_model.Association.objects.create(place="Other place", building_numbers="1")
+        api_model.FinancialTransaction.objects.create(
+            type="income", amount=Decimal("5.00"), reason="Donation", association=other)
+        self.assertNotModified(url, etag, True)
+
+    def test_household_statement_is_dropped_with_its_invoices(self):
+        household = api_model.Household.objects.create(
+            Association=self.association, apartment_number="2", building_no="1",
+            head_of_household="Head", contact_number="0944000001")
+        with self.captureOnCommitCallbacks(execute=True):
+            api_model.Invoice.issue(self.association, [(household.pk, Decimal("80.00"))],
+                                    "Monthly dues", date.today() + timedelta(days=10))
+        url = f"/api/v1/invoice/house/{household.pk}/"
+        self.assertEqual(len(self.client.get(url).data["not_paid"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoiceAdmin(api_model.Invoice, admin.site).delete_queryset(
+                None, api_model.Invoice.objects.filter(household=household))
+        self.assertEqual(self.client.get(url).data["not_paid"], [])
+
+
+class LedgerTests(TestCase):
+    """Every change to invoices and transactions moves the balance exactly once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Ledger place", building_numbers="1")
+        cls.households = [
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Head {number}",
+                contact_number=f"0933{number:06d}")
+            for number in range(3)
+        ]
+
+    def assertBalance(self, expected):
+        stored = api_model.FinancialSummary.objects.get(
+            Association=self.association).total_balance
+        ledger = api_model.LedgerEntry.objects.filter(
+            association=self.association).aggregate(total=Sum('amount', default=0))['total']
+        self.assertEqual(stored, Decimal(expected))
+        self.assertEqual(ledger, Decimal(expected))
+        report = api_model.FinancialSummary.reconcile([self.association.pk])[0]
+        self.assertEqual((report["invoice_gap"], report["transaction_gap"]),
+                         (Decimal("0.00"), Decimal("0.00")))
+
+    def issue(self, amount="100.00"):
+        summary = api_model.Invoice.issue(
+            self.association,
+            [(household.pk, Decimal(amount)) for household in self.households],
+            "Monthly dues", date.today() + timedelta(days=10))
+        return api_model.Invoice.objects.filter(group=summary["group"])
+
+    def test_settle_pays_each_invoice_once(self):
+        invoices = self.issue()
+        # Five days late: a 10% penalty is frozen when it is paid
+        invoices.filter(household=self.households[0]).update(
+            due_date=date.today() - timedelta(days=5))
+
+        summary = api_model.Invoice.settle(invoices, requested_ids=[0])
+        self.assertEqual(summary["updated"], 3)
+        self.assertEqual(summary["paid_amount"], Decimal("310.00"))
+        self.assertEqual(summary["results"][-1], {"id": 0, "status": "not_found"})
+        self.assertEqual(invoices.get(household=self.households[0]).penalty, Decimal("10.00"))
+        self.assertBalance("310.00")
+
+        summary = api_model.Invoice.settle(invoices)
+        self.assertEqual(summary["updated"], 0)
+        self.assertBalance("310.00")
+        group = api_model.InvoiceGroup.objects.get(code=invoices.first().group)
+        self.assertEqual((group.paid_count, group.total_collected), (3, Decimal("310.00")))
+
+    def test_saving_a_paid_invoice_again_does_not_post_twice(self):
+        invoice = self.issue().first()
+        invoice.is_paid = True
+        invoice.save()
+        self.assertBalance("100.00")
+
+        # is_paid is deferred, so save() has to read it back
+        invoice = api_model.Invoice.objects.defer('is_paid').get(pk=invoice.pk)
+        invoice.description = "Monthly dues, paid at the office"
+        invoice.save()
+        self.assertBalance("100.00")
+
+    def test_delete_unpaid_keeps_paid_invoices(self):
+        invoices = self.issue()
+        paid = invoices.first()
+        api_model.Invoice.settle(invoices.filter(pk=paid.pk))
+
+        summary = api_model.Invoice.delete_unpaid(invoices)
+        self.assertEqual(summary["deleted"], 2)
+        self.assertEqual(summary["deleted_amount"], Decimal("200.00"))
+        self.assertEqual(summary["skipped"], [{"id": paid.pk, "reason": "already_paid"}])
+        self.assertEqual(list(invoices.values_list('pk', flat=True)), [paid.pk])
+        self.assertBalance("100.00")
+        group = api_model.InvoiceGroup.objects.get(code=paid.group)
+        self.assertEqual((group.invoice_count, group.total_billed), (1, Decimal("100.00")))
+
+    def test_repair_keeps_payments_of_deleted_invoices(self):
+        invoices = self.issue()
+        paid = invoices.first()
+        api_model.Invoice.settle(invoices.filter(pk=paid.pk))
+        paid.delete()
+        self.assertBalance("100.00")
+
+        report = api_model.FinancialSummary.repair(self.association.pk)
+        self.assertEqual(report["expected"], Decimal("100.00"))
+        self.assertBalance("100.00")
+
+    def test_repair_posts_what_the_ledger_missed(self):
+        invoices = self.issue()
+        # Paid behind the ledger's back, and a stored balance that drifted
+        invoices.filter(pk=invoices.first().pk).update(is_paid=True)
+        api_model.FinancialSummary.objects.filter(
+            Association=self.association).update(total_balance=Decimal("7.00"))
+
+        report = api_model.FinancialSummary.repair(self.association.pk)
+        self.assertEqual((report["stored"], report["ledger"], report["invoice_gap"]),
+                         (Decimal("7.00"), Decimal("0.00"), Decimal("100.00")))
+        self.assertBalance("100.00")
+        # Nothing is left to repair
+        report = api_model.FinancialSummary.repair(self.association.pk)
+        self.assertEqual(report["stored"], report["expected"])
+        self.assertBalance("100.00")
+
+    def test_transaction_edits_and_deletes_are_reversed(self):
+        api_model.FinancialTransaction.objects.create(
+            type="income", amount=Decimal("500.00"), reason="Donation",
+            association=self.association)
+        txn = api_model.FinancialTransaction.objects.create(
+            type="income", amount=Decimal("100.00"), reason="Rent",
+            association=self.association)
+        self.assertBalance("600.00")
+
+        txn.amount = Decimal("150.00")
+        txn.save()
+        self.assertBalance("650.00")
+
+        txn.type = "expense"
+        txn.save()
+        self.assertBalance("350.00")
+
+        # Only the reason changes: nothing is posted
+        txn = api_model.FinancialTransaction.objects.only('reason', 'association').get(pk=txn.pk)
+        txn.reason = "Repairs"
+        txn.save()
+        self.assertBalance("350.00")
+
+        txn.delete()
+        self.assertBalance("500.00")
+
+        txn = api_model.FinancialTransaction(
+            type="expense", amount=Decimal("900.00"), reason="Too much",
+            association=self.association)
+        with self.assertRaises(ValueError):
+            txn.save()
+        self.assertBalance("500.00")
+
+
+
+class LedgerHistoryTests(TestCase):
+    """Past balances and monthly totals are read from the ledger's summaries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="History place", building_numbers="1")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="history", password="password", role="committee",
+            association=cls.association)
+
+    def post(self, day, amount, kind="adjustment"):
+        api_model.LedgerEntry.post([api_model.LedgerEntry(
+            association=self.association, kind=kind, amount=Decimal(amount),
+            occurred_at=api_model.BalanceCheckpoint.start_of(day) + timedelta(hours=12))])
+
+    def test_balance_as_of_reads_from_the_checkpoint(self):
+        self.post(date(2026, 1, 10), "100.00")
+        self.post(date(2026, 2, 15), "-30.00")
+        self.post(date(2026, 3, 5), "50.00")
+        moment = api_model.BalanceCheckpoint.start_of(date(2026, 2, 20))
+        without = api_model.BalanceCheckpoint.balance_as_of(self.association, moment)
+        self.assertEqual((without["balance"], without["checkpoint"]), (Decimal("70.00"), None))
+
+        written = api_model.BalanceCheckpoint.rebuild(until=date(2026, 3, 20))
+        self.assertEqual(written, 3)
+        with_checkpoint = api_model.BalanceCheckpoint.balance_as_of(self.association, moment)
+        self.assertEqual(with_checkpoint["balance"], Decimal("70.00"))
+        self.assertEqual(with_checkpoint["checkpoint"], date(2026, 2, 1))
+        self.assertEqual([entry["running_balance"] for entry in with_checkpoint["entries"]],
+                         [Decimal("70.00")])
+
+        # Before the first entry, and the end of a day through the view
+        early = api_model.BalanceCheckpoint.start_of(date(2026, 1, 10))
+        self.assertEqual(api_model.BalanceCheckpoint.balance_as_of(
+            self.association, early)["balance"], Decimal("0"))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/v1/FinancialSummary/as-of/", {"date": "2026-03-05"})
+        self.assertEqual(Decimal(response.data["balance"]), Decimal("120.00"))
+        self.assertEqual(response.data["checkpoint"], date(2026, 3, 1))
+
+    def test_rollups_follow_the_ledger(self):
+        for type, amount in (("income", "500.00"), ("income", "100.00"), ("expense", "40.00")):
+            api_model.FinancialTransaction.objects.create(
+                type=type, amount=Decimal(amount), reason="Dues",
+                association=self.association)
+        api_model.FinancialTransaction.objects.get(amount=Decimal("100.00")).delete()
+        self.post(date(2020, 1, 10), "-15.00")
+
+        def rollups():
+            return sorted(api_model.MonthlyRollup.objects.filter(
+                association=self.association).values_list(
+                'month', 'type', 'category', 'amount', 'entry_count'))
+
+        month = localdate().replace(day=1)
+        incremental = rollups()
+        self.assertEqual(incremental, sorted([
+            (date(2020, 1, 1), "expense", "adjustments", Decimal("15.00"), 1),
+            (month, "expense", "transactions", Decimal("40.00"), 1),
+            # The deleted income is taken back out in the month it was deleted
+            (month, "income", "transactions", Decimal("500.00"), 3),
+        ]))
+        self.assertEqual(api_model.MonthlyRollup.rebuild(self.association), 3)
+        self.assertEqual(rollups(), incremental)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/v1/FinancialSummary/monthly/", {
+            "by": "type", "from-month": month.strftime("%Y-%m")})
+        self.assertEqual([(row["type"], row["amount"]) for row in response.data["data"]],
+                         [("expense", Decimal("40.00")), ("income", Decimal("500.00"))])
+
+
+class InvoiceGroupTests(TestCase):
+    """The group counters follow invoices however they are deleted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Group place", building_numbers="1")
+        cls.households = [
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Head {number}",
+                contact_number=f"0955{number:06d}")
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        summary = api_model.Invoice.issue(
+            self.association,
+            [(household.pk, Decimal("100.00")) for household in self.households],
+            "Monthly dues", date.today() + timedelta(days=10))
+        self.invoices = api_model.Invoice.objects.filter(group=summary["group"])
+        api_model.Invoice.settle(self.invoices.filter(household=self.households[0]))
+
+    def assertCounters(self):
+        group = api_model.InvoiceGroup.objects.get(code=self.invoices.first().group)
+        paid = self.invoices.filter(is_paid=True)
+        self.assertEqual(
+            (group.invoice_count, group.paid_count, group.total_billed, group.total_collected),
+            (self.invoices.count(), paid.count(),
+             sum((invoice.amount for invoice in self.invoices), Decimal("0.00")),
+             sum((invoice.amount + invoice.penalty for invoice in paid), Decimal("0.00"))))
+
+    def test_household_delete_cascades_out_of_the_counters(self):
+        self.households[0].delete()
+        self.assertEqual(self.invoices.count(), 2)
+        self.assertCounters()
+
+    def test_admin_bulk_delete(self):
+        invoice_admin = InvoiceAdmin(api_model.Invoice, admin.site)
+        invoice_admin.delete_queryset(None, api_model.Invoice.objects.filter(
+            household__in=self.households[:2]))
+        self.assertEqual(self.invoices.count(), 1)
+        self.assertCounters()
+
+class ImportStatementTests(TestCase):
+    """Bank statement lines are imported once, however often the file is sent."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Import place", building_numbers="1")
+
+    def rows(self):
+        day = date(2026, 9, 1)
+        return [
+            {"line": 1, "date": day, "type": "income", "amount": Decimal("300.00"),
+             "reason": "Dues  Block A"},
+            {"line": 2, "date": day, "type": "expense", "amount": Decimal("120.00"),
+             "reason": "Cleaning"},
+            # The same line again, spaced and cased differently
+            {"line": 3, "date": day, "type": "income", "amount": Decimal("300.00"),
+             "reason": "dues block a"},
+        ]
+
+    def balance(self):
+        return api_model.FinancialSummary.objects.get(
+            Association=self.association).total_balance
+
+    def test_import_skips_lines_seen_before(self):
+        summary = api_model.FinancialTransaction.import_statement(self.association, self.rows())
+        self.assertEqual(summary, {"imported": 2, "net_amount": Decimal("180.00"),
+                                   "duplicates": [3]})
+        self.assertEqual(self.balance(), Decimal("180.00"))
+
+        summary = api_model.FinancialTransaction.import_statement(self.association, self.rows())
+        self.assertEqual(summary, {"imported": 0, "net_amount": Decimal(0),
+                                   "duplicates": [1, 2, 3]})
+        self.assertEqual(api_model.FinancialTransaction.objects.filter(
+            association=self.association).count(), 2)
+        self.assertEqual(self.balance(), Decimal("180.00"))
+
+    def test_import_that_overdraws_is_refused(self):
+        rows = [row for row in self.rows() if row["type"] == "expense"]
+        with self.assertRaises(ValueError):
+            api_model.FinancialTransaction.import_statement(self.association, rows)
+        self.assertFalse(api_model.FinancialTransaction.objects.filter(
+            association=self.association).exists())
+        self.assertEqual(self.balance(), Decimal("0.00"))
+
+
+class TransactionExportTests(TestCase):
+    """The export streams the association's transactions in date order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association, other = [
+            api_model.Association.objects.create(place=place, building_numbers="1")
+            for place in ("Export place", "Other export place")]
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="export", password="password", role="committee",
+            association=cls.association)
+        for owner, day, type, amount in (
+                (cls.association, date(2026, 3, 2), "income", "300.00"),
+                (cls.association, date(2026, 3, 1), "expense", "20.00"),
+                (cls.association, date(2026, 3, 31), "income", "12.50"),
+                (cls.association, date(2026, 4, 1), "income", "99.00"),
+                (other, date(2026, 3, 2), "income", "7.00")):
+            api_model.FinancialTransaction.objects.create(
+                type=type, amount=Decimal(amount), reason="Dues, March",
+                association=owner, date=api_model.BalanceCheckpoint.start_of(day))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get("/api/v1/FinTxn/export/", {
+            "from-date": "2026-03-01", "to-date": "2026-03-31", **params})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self.export())))
+        self.assertEqual(rows[0], ['id', 'type', 'amount', 'reason', 'date', 'accessed_by',
+                                   'association', 'association_name'])
+        self.assertEqual([(row[1], row[2], row[3]) for row in rows[1:]], [
+            ("expense", "20.00", "Dues, March"), ("income", "300.00", "Dues, March"),
+            ("income", "12.50", "Dues, March")])
+        self.assertEqual({row[7] for row in rows[1:]}, {"Export place"})
+
+    def test_ndjson(self):
+        records = [json.loads(line) for line in self.export(output="ndjson", type="income")
+                   .splitlines()]
+        self.assertEqual([record["amount"] for record in records], ["300.00", "12.50"])
+        self.assertEqual(records[0]["association"], self.association.pk)
+
+    def test_invalid_parameters(self):
+        url = "/api/v1/FinTxn/export/"
+        self.assertEqual(self.client.get(url, {"output": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from-date": "March"}).status_code, 400)
+
+
+class EventTests(TestCase):
+    """Closing, syncing and archiving an event are all safe to repeat."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Archive place", building_numbers="1")
+        for number in range(3):
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Head {number}",
+                contact_number=f"0922{number:06d}")
+
+    def test_close_twice_invoices_once(self):
+        event = api_model.Event.objects.create(
+            name="Cleanup day", date=date.today(), association=self.association,
+            penalty_price=100)
+        event.create_attendance_records()
+        summary = event.close()
+        self.assertTrue(summary["closed"])
+        self.assertEqual((summary["count"], summary["total_amount"]), (3, Decimal("300.00")))
+
+        # A second request, with the event loaded before the first one closed it
+        stale = api_model.Event.objects.get(pk=event.pk)
+        stale.closed_at = None
+        self.assertFalse(stale.close()["closed"])
+        self.assertEqual(stale.closed_at, api_model.Event.objects.get(pk=event.pk).closed_at)
+        self.assertEqual(api_model.Invoice.objects.filter(
+            household__Association=self.association).count(), 3)
+        self.assertEqual(list(api_model.ParticipationStats.objects.filter(
+            association=self.association).values_list('event_count', flat=True)), [1, 1, 1])
+
+    def test_resent_sync_batch_changes_nothing(self):
+        event = api_model.Event.objects.create(
+            name="Gate meeting", date=date.today(), association=self.association)
+        event.create_attendance_records()
+        first, second = api_model.EventAttendance.objects.filter(event=event)[:2]
+        start = now() - timedelta(hours=2)
+        scans = [
+            {"key": "a-1", "type": "check_in", "attendance_id": first.pk, "at": start},
+            {"key": "a-2", "type": "check_out", "attendance_id": first.pk,
+             "at": start + timedelta(hours=1)},
+            {"key": "b-1", "type": "check_in", "attendance_id": second.pk, "at": start},
+        ]
+        summary = event.sync_scans(scans)
+        self.assertEqual(summary["applied"], 3)
+        self.assertEqual(summary["attendance_ids"], sorted([first.pk, second.pk]))
+
+        # A newer check-in at the gate, then the lost response makes the device resend
+        event.check_in([second.pk], at=start + timedelta(minutes=30))
+        summary = event.sync_scans(scans + [
+            {"key": "b-0", "type": "check_out", "attendance_id": second.pk,
+             "at": start + timedelta(minutes=10)},
+        ])
+        self.assertEqual(summary["duplicates"], ["a-1", "a-2", "b-1"])
+        self.assertEqual(summary["stale"], ["b-0"])
+        self.assertEqual(summary["attendance_ids"], [])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(first.attended)
+        self.assertEqual(first.exit_time, start + timedelta(hours=1))
+        self.assertEqual(second.entry_time, start + timedelta(minutes=30))
+        self.assertIsNone(second.exit_time)
+        self.assertEqual(api_model.AttendanceScan.objects.filter(event=event).count(), 4)
+
+    def test_second_check_out_is_not_applied(self):
+        event = api_model.Event.objects.create(
+            name="Exit meeting", date=date.today(), association=self.association)
+        event.create_attendance_records()
+        record = api_model.EventAttendance.objects.filter(event=event).first()
+        start = now() - timedelta(hours=2)
+        summary = event.sync_scans([
+            {"key": "c-1", "type": "check_in", "attendance_id": record.pk, "at": start},
+            {"key": "c-2", "type": "check_out", "attendance_id": record.pk,
+             "at": start + timedelta(hours=1)},
+        ])
+        self.assertEqual(summary["applied"], 2)
+
+        # A second gate saw the household leave too, under its own key
+        summary = event.sync_scans([
+            {"key": "d-1", "type": "check_out", "attendance_id": record.pk,
+             "at": start + timedelta(hours=1, minutes=5)},
+        ])
+        self.assertEqual((summary["applied"], summary["stale"], summary["attendance_ids"]),
+                         (0, [], []))
+        record.refresh_from_db()
+        self.assertEqual(record.exit_time, start + timedelta(hours=1))
+
+    def test_archive_keeps_the_scans_of_closed_events(self):
+        old = date.today() - timedelta(days=400)
+        closed = api_model.Event.objects.create(
+            name="Old meeting", date=old, association=self.association)
+        open_event = api_model.Event.objects.create(
+            name="Open meeting", date=old, association=self.association)
+        for event in (closed, open_event):
+            event.create_attendance_records()
+        record = api_model.EventAttendance.objects.filter(event=closed).first()
+        scans = [{"key": "gate-1", "type": "check_in", "attendance_id": record.pk,
+                  "at": now() - timedelta(days=400)}]
+        closed.sync_scans(scans)
+        closed.close()
+
+        with CaptureQueriesContext(connection) as context:
+            summary = api_model.Event.archive_older_than(days=180)
+        self.assertEqual(summary, {"events": 1, "records": 3})
+        deletes = [query["sql"] for query in context.captured_queries
+                   if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+
+        open_event.refresh_from_db()
+        self.assertIsNone(open_event.archived_at)
+        self.assertTrue(api_model.AttendanceScan.objects.filter(
+            event=closed, attendance_id=record.pk).exists())
+        # The device sends its batch again after the event was archived
+        self.assertEqual(closed.sync_scans(scans)["duplicates"], ["gate-1"])
+
+
+class CheckInOutTests(TestCase):
+    """A scan only reports, and publishes, the records it changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Gate place", building_numbers="1")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="gate", password="password", role="committee",
+            association=cls.association)
+        for number in range(3):
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Head {number}",
+                contact_number=f"0966{number:06d}")
+        cls.event = api_model.Event.objects.create(
+            name="Gate meeting", date=date.today(), association=cls.association)
+        cls.event.create_attendance_records()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ids = list(api_model.EventAttendance.objects.filter(
+            event=self.event).order_by('id').values_list('id', flat=True))
+
+    def scan(self, type, ids):
+        with mock.patch.object(api_live.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put("/api/v1/event/attendance/", {
+                    "type": type, "event_id": self.event.pk, "event_att_ids": ids,
+                }, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data, publish
+
+    def test_repeated_end_scan_changes_nothing(self):
+        self.scan("start", self.ids[:2])
+        data, publish = self.scan("end", self.ids[:2])
+        self.assertEqual(data["changed"], 2)
+        self.assertEqual(sorted(record["id"] for record in data["records"]), self.ids[:2])
+        publish.assert_called_once()
+        left = api_model.EventAttendance.objects.get(pk=self.ids[0]).exit_time
+
+        # The first household is scanned again with one that had not left
+        data, publish = self.scan("end", [self.ids[0], self.ids[2]])
+        self.assertEqual(data["changed"], 1)
+        self.assertEqual([record["id"] for record in data["records"]], [self.ids[2]])
+        self.assertEqual(publish.call_args.args[1]["records"], data["records"])
+
+        data, publish = self.scan("end", self.ids)
+        self.assertEqual((data["changed"], data["records"]), (0, []))
+        publish.assert_not_called()
+        self.assertEqual(api_model.EventAttendance.objects.get(pk=self.ids[0]).exit_time, left)
+        self.assertEqual(data["counts"], {"attended_count": 2, "absent_count": 1})
+
+    @override_settings(TIME_ZONE="Africa/Addis_Ababa")
+    def test_event_times_are_local(self):
+        self.scan("start", self.ids[:1])
+        self.event.refresh_from_db()
+        started = datetime.combine(date.today(), self.event.start_time)
+        local = datetime.combine(date.today(), localtime(now()).time())
+        self.assertLess(abs(local - started), timedelta(minutes=1))
+
+
+class LiveStreamTests(TestCase):
+    """The live stream sends a snapshot, then the published deltas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = api_model.Association.objects.create(
+            place="Live place", building_numbers="1")
+        cls.user = api_model.CustomUser.objects.create_user(
+            username="screen", password="password", role="committee",
+            association=cls.association)
+        for number in range(2):
+            api_model.Household.objects.create(
+                Association=cls.association, apartment_number=str(number),
+                building_no="1", head_of_household=f"Head {number}",
+                contact_number=f"0988{number:06d}")
+        cls.event = api_model.Event.objects.create(
+            name="Live meeting", date=date.today(), association=cls.association)
+        cls.event.create_attendance_records()
+
+    def open(self, pk, **params):
+        request = RequestFactory().get(f"/api/v1/event/live/{pk}/", params)
+        return async_to_sync(api_views.event_live_stream)(request, pk)
+
+    def test_snapshot_then_deltas(self):
+        token = str(AccessToken.for_user(self.user))
+
+        async def read():
+            response = await api_views.event_live_stream(RequestFactory().get(
+                f"/api/v1/event/live/{self.event.pk}/", {"token": token}), self.event.pk)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = aiter(response.streaming_content)
+            events = [await anext(chunks)]
+            # Published from another thread, as the sync views do
+            await sync_to_async(api_live.broker.publish, thread_sensitive=False)(
+                self.event.pk, {"type": "check_in", "records": [{"id": 1}]})
+            events.append(await anext(chunks))
+            await chunks.aclose()
+            return [chunk.decode() for chunk in events]
+
+        snapshot, delta = async_to_sync(read)()
+        kind, data = snapshot.split("\n")[:2]
+        self.assertEqual(kind, "event: snapshot")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["counts"],
+                         {"attended_count": 0, "absent_count": 2})
+        self.assertTrue(delta.startswith("event: check_in\n"))
+        # Closing the stream unsubscribes it
+        self.assertNotIn(str(self.event.pk), api_live.broker._subscribers)
+
+    def test_refused_streams(self):
+        self.assertEqual(self.open(self.event.pk).status_code, 401)
+        other = api_model.Association.objects.create(place="Other live place",
+                                                     building_numbers="1")
+        hidden = api_model.Event.objects.create(name="Hidden", date=date.today(),
+                                                association=other)
+        token = str(AccessToken.for_user(self.user))
+        self.assertEqual(self.open(hidden.pk, token=token).status_code, 404)
+        self.assertNotIn(str(hidden.pk), api_live.broker._subscribers)
+
+    def test_a_slow_screen_is_told_to_reconnect(self):
+        async def overflow():
+            queue = api_live.broker.subscribe(self.event.pk)
+            try:
+                with mock.patch.object(api_live.EventBroker, 'max_backlog', 2):
+                    small = api_live.broker.subscribe(self.event.pk)
+                for number in range(3):
+                    api_live.broker.publish(self.event.pk, {"type": "sync", "number": number})
+                await asyncio.sleep(0)
+                return queue.qsize(), [small.get_nowait() for _ in range(small.qsize())]
+            finally:
+                api_live.broker.unsubscribe(self.event.pk, queue)
+                api_live.broker.unsubscribe(self.event.pk, small)
+
+        size, received = async_to_sync(overflow)()
+        self.assertEqual(size, 3)
+        self.assertEqual(received, [{"type": "overflow"}])
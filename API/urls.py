@@ -20,6 +20,10 @@ urlpatterns = [
     # *  ---------------------- householdmember pathes ----------------------
     path("FinancialSummary/",
          api_views.FinancialSummaryRetrieveAPIView.as_view()),
+    path("FinancialSummary/as-of/",
+         api_views.BalanceAsOfAPIView.as_view()),
+    path("FinancialSummary/monthly/",
+         api_views.MonthlyRollupAPIView.as_view()),
 
 
     # *  ---------------------- Invoice pathes ----------------------
@@ -27,6 +31,15 @@ urlpatterns = [
          api_views.InvoiceListAPIView.as_view()),
 
 
+    path("invoice/groups/",
+         api_views.InvoiceGroupListAPIView.as_view()),
+
+    path("invoice/aging/",
+         api_views.ReceivablesAgingAPIView.as_view()),
+
+    path("invoice/aging/history/",
+         api_views.ReceivablesAgingHistoryAPIView.as_view()),
+
     path("invoice/process/",
          api_views.InvoiceUpdateDelete.as_view()),
 
@@ -43,12 +56,20 @@ urlpatterns = [
          api_views.FinancialTransactionListCreateAPIView.as_view()),
     path("FinTxn/update/",
          api_views.FinancialTransactionUpdate.as_view()),
+    path("FinTxn/export/",
+         api_views.FinancialTransactionExportAPIView.as_view()),
+    path("FinTxn/import/",
+         api_views.FinancialTransactionImportAPIView.as_view()),
 
     # *  ---------------------------- Event pathes --------------------------
 
     path("event/", api_views.EventListCreateAPIView.as_view()),
     path("event/attendance/", api_views.EventAttendanceUpdateAPIView.as_view()),
+    path("event/attendance/sync/", api_views.EventAttendanceSyncAPIView.as_view()),
     path("event/retrive/<pk>/", api_views.EventRetrieveDestroyAPIView.as_view()),
+    path("event/close/<pk>/", api_views.EventCloseAPIView.as_view()),
+    path("event/participation/", api_views.ParticipationStatsAPIView.as_view()),
+    path("event/live/<pk>/", api_views.event_live_stream),
 
 
     path('projects/', api_views.ProjectListCreateView.as_view(),
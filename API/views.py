@@ -1,7 +1,6 @@
 from .serializers import ProjectSerializer, ProjectProgressSerializer
 from .models import Project, ProjectProgress
 from django.db.models import Sum
-import uuid
 from rest_framework.exceptions import NotFound
 from rest_framework import status
 from rest_framework.decorators import api_view, APIView
@@ -11,13 +10,29 @@ from rest_framework import generics
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from API import models as api_model
 from API import serializers as api_serializers
 from API import mixins as api_mixins
+from API import pagination as api_pagination
+from API.statements import parse_statement
+from API import live as api_live
+from API import search as api_search
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+import asyncio
 from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import is_naive, localdate, localtime, make_aware, now
+from django.utils.dateparse import parse_datetime
 # Create your views here.
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import csv
+import json
 from rest_framework import serializers
 
 
@@ -27,6 +42,7 @@ from rest_framework import serializers
 
 
 class HouseholdListCreateAPIView(
+        api_mixins.ConditionalGetMixin,
         api_mixins.GetOnlySameAssociateData,
         generics.ListCreateAPIView):
     """
@@ -50,9 +66,10 @@ class HouseholdListCreateAPIView(
         look_up_field (str): Field used for lookup in the API.
     """
 
-    queryset = api_model.Household.objects.all()
+    queryset = api_model.Household.objects.select_related('Association')
     serializer_class = api_serializers.HouseholdSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = api_pagination.HouseholdPagination
     look_up_field = "Association"
 
     def list(self, request, *args, **kwargs):
@@ -73,16 +90,26 @@ class HouseholdListCreateAPIView(
         search_term = self.request.GET.get('search', None)
         print(type(search_term), search_term)
 
-        if search_term:
+        if search_term and api_search.is_available():
+            # Ranked full-text matches, read one page at a time, see API/search.py
+            self.paginator.ordering = ('search_rank', 'id')
+            queryset = api_search.ranked(queryset, api_search.ranked_ids(
+                'household_search', search_term,
+                association_id=request.user.association_id,
+                limit=self.paginator.get_page_size(request) + 1,
+                after=self.paginator.decode_cursor(request)))
+        elif search_term:
             queryset = queryset.filter(
                 Q(contact_number__icontains=search_term) |
                 Q(head_of_household__icontains=search_term)
             )
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
         return Response({
             'custom_message': "This is a custom message",
+            'next': self.paginator.get_next_link(),
             'data': serializer.data
         }, status=status.HTTP_200_OK)
 
@@ -113,17 +140,24 @@ class HouseholdListCreateAPIView(
                 {"error": "A household with the same association, building number, and apartment number already exists."}
             )
 
-        new_household = api_model.Household.objects.create(
-            Association=Association,
-            apartment_number=request.data.get('apartment_number'),
-            building_no=request.data.get('building_no'),
-            head_of_household=request.data.get('head_of_household'),
-            contact_number=request.data.get('contact_number'),
-            email=request.data.get('email'),
-            is_rented=request.data.get('is_rented'),
-            is_empty_daytime=request.data.get('is_empty_daytime'),
-            documents=request.data.get('documents'),
-        )
+        try:
+            # The unique constraint catches requests racing past the check above
+            with transaction.atomic():
+                new_household = api_model.Household.objects.create(
+                    Association=Association,
+                    apartment_number=request.data.get('apartment_number'),
+                    building_no=request.data.get('building_no'),
+                    head_of_household=request.data.get('head_of_household'),
+                    contact_number=request.data.get('contact_number'),
+                    email=request.data.get('email'),
+                    is_rented=request.data.get('is_rented'),
+                    is_empty_daytime=request.data.get('is_empty_daytime'),
+                    documents=request.data.get('documents'),
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"error": "A household with the same association, building number, and apartment number already exists."}
+            )
 
         serializer = self.get_serializer_class()(
             new_household, context={'request': request})
@@ -276,9 +310,10 @@ class HouseholdMemberListCreateAPIView(
         api_mixins.GetOnlyUserHouseholdMemberData,
         generics.ListCreateAPIView):
 
-    queryset = api_model.HouseholdMember.objects.all()
+    queryset = api_model.HouseholdMember.objects.select_related('household')
     serializer_class = api_serializers.HouseholdMemberSerializer
     permission_classes = [AllowAny]
+    pagination_class = api_pagination.HouseholdMemberPagination
     look_up_field = "household__Association"
 
     def list(self, request, *args, **kwargs):
@@ -299,16 +334,27 @@ class HouseholdMemberListCreateAPIView(
         search_term = self.request.GET.get('search', None)
         print(type(search_term), search_term)
 
-        if search_term:
+        if search_term and api_search.is_available():
+            self.paginator.ordering = ('search_rank', 'id')
+            queryset = api_search.ranked(queryset, api_search.ranked_ids(
+                'member_search', search_term,
+                # The list itself is open to anonymous users
+                association_id=getattr(request.user, 'association_id', None),
+                limit=self.paginator.get_page_size(request) + 1,
+                after=self.paginator.decode_cursor(request)))
+        elif search_term:
             queryset = queryset.filter(
                 Q(contact_number__icontains=search_term) |
                 Q(name__icontains=search_term)
-            ).order_by('-current_member', 'name')
+            )
 
-        serializer = self.get_serializer(queryset, many=True)
+        # Ordered by current members first, then by name
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
         return Response({
             'custom_message': "This is a custom message",
+            'next': self.paginator.get_next_link(),
             'data': serializer.data
         }, status=status.HTTP_200_OK)
 
@@ -379,6 +425,7 @@ class HouseholdMemberRetrieveUpdateDestroyAPIView(
 
 
 class FinancialSummaryRetrieveAPIView(
+        api_mixins.ConditionalGetMixin,
         api_mixins.GetOnlySameAssociateData,
         generics.RetrieveAPIView):
     """
@@ -399,7 +446,7 @@ class FinancialSummaryRetrieveAPIView(
 
     queryset = api_model.FinancialSummary.objects.all()
     serializer_class = api_serializers.FinancialSummarySerializer
-    permission_classes = [AllowAny]
+    permission_classes = [IsAuthenticated]
     look_up_field = "Association"
 
     def get_object(self):
@@ -413,22 +460,90 @@ class FinancialSummaryRetrieveAPIView(
             NotFound: If no financial summary is found.
         """
         try:
-            # Association = self.request.user.association
-            # obj = api_model.FinancialSummary.objects.get(Association=Association)
-            # ! please uncomment the above when the authentiion is setupeed
-            obj = api_model.FinancialSummary.objects.first()  # ! and remove this
+            obj = self.get_queryset().get()
         except api_model.FinancialSummary.DoesNotExist:
             raise NotFound("Object not found")
 
         return obj
 
 
+class BalanceAsOfAPIView(APIView):
+    """
+    API view for the balance of the user's association on a past date.
+
+    The balance is read from the closest monthly checkpoint plus the ledger
+    entries since it, which are returned with their running balance.
+
+    Methods:
+        - GET: Retrieve the balance at the end of `date` (YYYY-MM-DD, default
+          today).
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            day = datetime.strptime(request.GET["date"], "%Y-%m-%d").date() \
+                if request.GET.get("date") else date.today()
+        except ValueError:
+            return Response({"error": "Invalid 'date' format. Use 'YYYY-MM-DD'."}, status=400)
+
+        # Everything posted up to the end of the day
+        moment = api_model.BalanceCheckpoint.start_of(day + timedelta(days=1))
+        result = api_model.BalanceCheckpoint.balance_as_of(
+            request.user.association, moment)
+        return Response({"date": day, **result})
+
+
+class MonthlyRollupAPIView(APIView):
+    """
+    API view for the monthly income and expense of the user's association.
+
+    Reads the incrementally maintained rollups, so a chart over years costs a
+    few rows per month.
+
+    Methods:
+        - GET: Retrieve the rollups, optionally limited with `from-month` and
+          `to-month` (YYYY-MM, inclusive). With `by=type` the categories of
+          each type are added up.
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        rollups = api_model.MonthlyRollup.objects.filter(
+            association=request.user.association)
+        try:
+            if request.GET.get("from-month"):
+                rollups = rollups.filter(month__gte=datetime.strptime(
+                    request.GET.get("from-month"), "%Y-%m").date())
+            if request.GET.get("to-month"):
+                rollups = rollups.filter(month__lte=datetime.strptime(
+                    request.GET.get("to-month"), "%Y-%m").date())
+        except ValueError:
+            return Response({"error": "Invalid month format. Use 'YYYY-MM'."}, status=400)
+
+        if request.GET.get("by") == "type":
+            rows = (rollups.values('month', 'type')
+                    .annotate(amount=Sum('amount'), entry_count=Sum('entry_count'))
+                    .order_by('month', 'type'))
+        else:
+            rows = rollups.values('month', 'type', 'category', 'amount',
+                                  'entry_count').order_by('month', 'type', 'category')
+        return Response({"data": list(rows)})
+
+
 # * -------------------------------------------------------------------------------------------------
 # * ----------------------------------------- Invoice  Views ----------------------------------------
 # * -------------------------------------------------------------------------------------------------
 
 
 class InvoiceListAPIView(
+        api_mixins.ConditionalGetMixin,
         api_mixins.GetOnlySameAssociateData,
         generics.ListCreateAPIView):
     """
@@ -448,10 +563,11 @@ class InvoiceListAPIView(
         - list: Retrieves invoices with optional filtering and a custom response.
         - create: Creates multiple invoices for specified households or an association.
     """
-    queryset = api_model.Invoice.objects.all()
+    queryset = api_model.Invoice.objects.select_related('household')
     serializer_class = api_serializers.InvoiceSerializer
     permission_classes = [AllowAny]
-    look_up_field = "Association"
+    pagination_class = api_pagination.InvoicePagination
+    look_up_field = "household__Association"
 
     def list(self, request, *args, **kwargs):
         """
@@ -464,7 +580,6 @@ class InvoiceListAPIView(
             Response: A JSON response containing the invoices and metadata.
         """
         queryset = self.get_queryset()
-        group_list = list(queryset.values_list('group', flat=True).distinct())
 
         search_term = self.request.GET.get('status', None)
         print(type(search_term), search_term)
@@ -522,38 +637,58 @@ class InvoiceListAPIView(
             except ValueError:
                 return Response({"error": "Invalid 'to-date' format. Use 'YYYY-MM-DD'."}, status=400)
 
-        for invoice in queryset:
-            invoice.calculate_penalty()
-
         search_term = self.request.GET.get('group', None)
         if search_term:
             queryset = queryset.filter(group=search_term)
-        print(len(queryset))
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
+
+        # Penalties and status are computed by the database, see `InvoiceQuerySet.with_penalty`
+        queryset = queryset.with_penalty()
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        data = {
             'custom_message': "This is a custom message",
-            "group_list": group_list,
+            'next': self.paginator.get_next_link(),
             'data': serializer.data
-        }, status=status.HTTP_200_OK)
+        }
+
+        # Scope-wide figures are only sent along with the first page
+        if self.paginator.is_first_page():
+            totals = queryset.aggregate(
+                total_amount=Sum('amount'), total_penalty=Sum('current_penalty'))
+            data.update({
+                "group_list": list(api_model.InvoiceGroup.objects.filter(
+                    association=request.user.association).order_by('-created_at').values_list('code', flat=True)),
+                "total_amount": totals['total_amount'] or 0,
+                "total_penalty": totals['total_penalty'] or 0,
+            })
+        return Response(data, status=status.HTTP_200_OK)
 
     def create(self, request, *args, **kwargs):
         """
         Creates invoices for households or an entire association.
 
+        `homes` is either `"ALL"` or a list of household ids; an optional
+        `building` narrows the selection to one building. Ownership of the
+        homes is checked with one query and the invoices are inserted in bulk.
+
         Args:
             request: The HTTP POST request containing invoice data.
 
         Returns:
-            Response: A JSON response containing the created invoice data.
+            Response: A JSON response containing a summary of the created group.
         """
         homes = request.data.get('homes')
-        # ! homes is "ALL" then extract user , then assossiation , then create for all homes in assossiation
+        building = request.data.get('building')
+        households = api_model.Household.objects.filter(
+            Association=request.user.association)
+        if building:
+            households = households.filter(building_no=building)
+
         data = {
             "amount": request.data.get('amount'),
             "description": request.data.get('description'),
             "due_date": request.data.get('due_date'),
-            "created_by": request.data.get('created_by'),
-            "group": str(uuid.uuid4()).replace('-', '')[:7]
+            "created_by": request.data.get('created_by') or "",
         }
 
         if 'due_date' in data:
@@ -565,30 +700,62 @@ class InvoiceListAPIView(
         if data['due_date'] < date.today():
             raise serializers.ValidationError(
                 {"due_date": "The 'due_date' cannot be in the past."})
-        created_invoices = []  # To store created invoice objects
-
-        group = uuid.uuid4
-
-        for home in homes:
-            data.update(
-                {"household": api_model.Household.objects.get(pk=home)})
-            print(f"i was here {home}")
-            invoice = api_model.Invoice.objects.create(**data)
-            print(f"i was here {home}")
-            created_invoices.append(invoice.id)
+        try:
+            amount = Decimal(str(data.pop('amount')))
+        except InvalidOperation:
+            amount = None
+        if amount is None or amount <= 0:
+            raise serializers.ValidationError(
+                {"amount": "Invoice amount must be greater than zero."})
 
-        data = []
-        for x in created_invoices:
-            data.append(api_model.Invoice.objects.get(id=x))
+        if homes == "ALL" or (not homes and building):
+            household_ids = list(households.values_list('id', flat=True))
+        elif homes:
+            try:
+                requested = {int(home) for home in homes}
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(
+                    {"homes": "Expected \"ALL\" or a list of household ids."})
+            household_ids = list(households.filter(
+                pk__in=requested).values_list('id', flat=True))
+            unknown = requested.difference(household_ids)
+            if unknown:
+                raise serializers.ValidationError(
+                    {"homes": f"Unknown households: {sorted(unknown)}"})
+        else:
+            raise serializers.ValidationError(
+                {"homes": "No homes provided."})
 
-        data = api_serializers.InvoiceSerializer(data, many=True).data
+        summary = api_model.Invoice.issue(
+            request.user.association,
+            ((household_id, amount) for household_id in household_ids), **data)
 
         return Response({
-            # Serialized data of created invoices
             'custom_message': "Invoices created successfully",
-            "instances": data
+            "summary": summary
         }, status=status.HTTP_201_CREATED)
-        # return super().create(request, *args, **kwargs)
+
+
+class InvoiceGroupListAPIView(
+        api_mixins.GetOnlySameAssociateData,
+        generics.ListAPIView):
+    """
+    API view for listing invoice groups with their progress.
+
+    Methods:
+        - GET: Retrieve the invoice groups of the association, newest first.
+
+    Attributes:
+        queryset: All `InvoiceGroup` objects.
+        serializer_class: Serializer class for `InvoiceGroup`.
+        permission_classes: Specifies the permission required for accessing this API.
+        look_up_field: Field used to identify invoice groups based on the association.
+    """
+    queryset = api_model.InvoiceGroup.objects.all()
+    serializer_class = api_serializers.InvoiceGroupSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = api_pagination.InvoiceGroupPagination
+    look_up_field = "association"
 
 
 class InvoiceRetrieveAPIView(
@@ -610,7 +777,7 @@ class InvoiceRetrieveAPIView(
     queryset = api_model.Invoice.objects.all()
     serializer_class = api_serializers.InvoiceSerializer
     permission_classes = [AllowAny]
-    look_up_field = "Association"
+    look_up_field = "household__Association"
 
 
 class InvoiceUpdateDelete(APIView):
@@ -632,108 +799,73 @@ class InvoiceUpdateDelete(APIView):
         """
         Marks invoices or groups of invoices as paid.
 
+        The invoices are settled in one transaction, see `Invoice.settle`.
+
         Args:
             request: The HTTP PUT request containing invoice IDs or a group identifier.
 
         Returns:
             Response: A JSON response indicating the success of the operation, 
-                      along with the updated amount and count.
+                      along with the updated amount, count and per-invoice results.
         """
 
-        # ! handle payment accpeted by.. set the user name here
-
         user = request.user
         user_name = user.first_name + " " + user.last_name
+        invoices = api_model.Invoice.objects.filter(
+            household__Association=user.association)
 
+        requested_ids = None
         if request.data.get("invoices"):
-            amount = 0
-            updated = 0
-            for id in request.data.get("invoices"):
-                try:
-                    obj = api_model.Invoice.objects.get(id=id)
-                    if not (obj.is_paid):
-                        amount += obj.amount + obj.penalty
-                        obj.is_paid = True
-                        obj.payment_date = date.today()
-                        obj.payment_accepted_by = user_name
-                        obj.save()
-                        updated += 1
-
-                except:
-                    print("passed")
-            if amount == 0 and updated == 0:
-                return Response({"error": "something went wrong:"})
-            return Response({"message": f"successfully paid {updated} invoices", "updated": updated, "paid_amount": amount})
-
+            try:
+                requested_ids = [int(id) for id in request.data.get("invoices")]
+            except (TypeError, ValueError):
+                return Response({"error": "Invoices must be a list of ids"}, status=400)
+            invoices = invoices.filter(pk__in=requested_ids)
         elif request.data.get("group"):
-            amount = 0
-            updated = 0
-            qs = api_model.Invoice.objects.filter(
-                group=request.data.get("group"))
-            for obj in qs:
-                try:
-                    if not (obj.is_paid):
-                        amount += obj.amount + obj.penalty
-                        obj.is_paid = True
-                        obj.save()
-                        updated += 1
-                except:
-                    print("passed 2")
-            if amount == 0 and updated == 0:
-                return Response({"error": "something went wrong:"})
-            return Response({"message": f"successfully paid {updated} invoices", "updated": updated, "paid_amount": amount})
-        print("hello")
-
-        if not request.data.get("invoices") and not request.data.get("group"):
+            invoices = invoices.filter(group=request.data.get("group"))
+        else:
             return Response({"error": "No invoices or group provided"})
 
+        settlement = api_model.Invoice.settle(
+            invoices, accepted_by=user_name, requested_ids=requested_ids)
+        if settlement["updated"] == 0:
+            return Response({"error": "something went wrong:", "results": settlement["results"]})
+        return Response({"message": f"successfully paid {settlement['updated']} invoices", **settlement})
+
     def delete(self, request, *args, **kwargs):
         """
         Deletes unpaid invoices individually or in a group.
 
+        The invoices are deleted in one transaction, see `Invoice.delete_unpaid`.
+
         Args:
             request: The HTTP DELETE request containing invoice IDs or a group identifier.
 
         Returns:
             Response: A JSON response indicating the success of the operation, 
-                      along with the deleted amount and count.
+                      along with the deleted amount, count and the skipped ids.
         """
+        invoices = api_model.Invoice.objects.filter(
+            household__Association=request.user.association)
+
+        requested_ids = None
         if request.data.get("invoices"):
-            count = 0
-            amount = 0
-            for id in request.data.get("invoices"):
-                try:
-                    obj = api_model.Invoice.objects.get(id=id)
-                    obj.calculate_penalty()
-                    if not (obj.is_paid):
-                        amount += obj.amount + obj.penalty
-                        obj.delete()
-                        count += 1
-                except:
-                    print("passed")
-            if amount == 0 and count == 0:
-                return Response({"error": "something went wrong:"})
-            return Response({"message": f"successfully deleted {count} invoices", "deleted": count, "deleted_amount": amount})
+            try:
+                requested_ids = [int(id) for id in request.data.get("invoices")]
+            except (TypeError, ValueError):
+                return Response({"error": "Invoices must be a list of ids"}, status=400)
+            invoices = invoices.filter(pk__in=requested_ids)
         elif request.data.get("group"):
-            amount = 0
-            count = 0
-            qs = api_model.Invoice.objects.filter(
-                group=request.data.get("group"))
-            for obj in qs:
-                try:
-                    if not (obj.is_paid):
-                        amount += obj.amount + obj.penalty
-                        obj.delete()
-                        count += 1
-                except:
-                    print("passed 2")
-            if amount == 0 and count == 0:
-                return Response({"error": "something went wrong:"})
-            return Response({"message": f"successfully deleted {count} invoices", "deleted": count, "deleted_amount": amount})
-
-        if not request.data.get("invoices") and not request.data.get("group"):
+            invoices = invoices.filter(group=request.data.get("group"))
+        else:
             return Response({"error": "No invoices or group provided"})
 
+        deletion = api_model.Invoice.delete_unpaid(
+            invoices, requested_ids=requested_ids)
+        if deletion["deleted"] == 0:
+            return Response({"error": "something went wrong:", "skipped": deletion["skipped"]})
+        return Response({"message": f"successfully deleted {deletion['deleted']} invoices", **deletion})
+
 
 class InvoiceHandleHouseHold(APIView):
     """
@@ -761,44 +893,34 @@ class InvoiceHandleHouseHold(APIView):
             Response: A JSON response containing the household data, unpaid and paid invoices,
                       and the total amounts for each category.
         """
-        household = api_model.Household.objects.filter(pk=pk)
-        if household.exists():
-            household = household[0]
-            not_paid_invoice = api_model.Invoice.objects.filter(
-                household=household).filter(is_paid=False)
-            for obj in not_paid_invoice:
-                obj.calculate_penalty()
-
-            paid_invoice = api_model.Invoice.objects.filter(
-                household=household).filter(is_paid=True)
-            household = api_serializers.HouseholdSerializer(household).data
-        else:
+        household = api_model.Household.objects.filter(
+            pk=pk, Association=request.user.association).first()
+        if not household:
             return Response({
                 "message": "something Went Wrong",
             })
-        if not_paid_invoice.exists():
-            not_paid = api_serializers.InvoiceHomeSerializer(
-                not_paid_invoice, many=True).data
-            not_paid_amount = not_paid_invoice.aggregate(Sum('amount'))[
-                'amount__sum'] + paid_invoice.aggregate(Sum('penalty'))['penalty__sum']
-        else:
-            not_paid = []
-            not_paid_amount = 0
-        if paid_invoice.exists():
-            paid = api_serializers.InvoiceHomeSerializer(
-                paid_invoice, many=True).data
-            paid_amount = paid_invoice.aggregate(Sum('amount'))[
-                'amount__sum'] + paid_invoice.aggregate(Sum('penalty'))['penalty__sum']
-        else:
-            paid = []
-            paid_amount = 0
+
+        # The statement is cached until one of the household's invoices changes
+        cache_key = api_model.Household.statement_cache_key(household.pk)
+        statement = cache.get(cache_key)
+        if statement is None:
+            totals = household.invoice_statement()
+            statement = {
+                "not_paid": api_serializers.InvoiceHomeSerializer(
+                    totals["not_paid"], many=True).data,
+                "paid": api_serializers.InvoiceHomeSerializer(
+                    totals["paid"], many=True).data,
+                "paid_amount": totals["paid_amount"] + totals["paid_penalty"],
+                "paid_penalty": totals["paid_penalty"],
+                "not_paid_amount": totals["not_paid_amount"] + totals["not_paid_penalty"],
+                "not_paid_penalty": totals["not_paid_penalty"],
+            }
+            cache.set(cache_key, statement,
+                      settings.HOUSEHOLD_STATEMENT_CACHE_TIMEOUT)
 
         return Response({
-            "household": household,
-            "not_paid": not_paid,
-            "paid": paid,
-            "paid_amount": paid_amount,
-            "not_paid_amount": not_paid_amount
+            "household": api_serializers.HouseholdSerializer(household).data,
+            **statement
         })
 
     def post(self, request, pk, *args, **kwargs):
@@ -811,29 +933,23 @@ class InvoiceHandleHouseHold(APIView):
 
         Returns:
             Response: A JSON response indicating the success of the payment operation,
-                      including the total amount paid and the number of invoices updated.
+                      including the total amount paid, the number of invoices updated
+                      and per-invoice results.
         """
 
         user = request.user
         user_name = user.first_name + " " + user.last_name
-        household = api_model.Household.objects.filter(pk=pk)
+        household = api_model.Household.objects.filter(
+            pk=pk, Association=user.association)
         if household.exists():
-            household = household[0]
-            not_paid_invoice = api_model.Invoice.objects.filter(
-                household=household).filter(is_paid=False)
-            amount = 0
-            count = 0
-            for obj in not_paid_invoice:
-                obj.is_paid = True
-                obj.payment_date = date.today()
-                obj.payment_accepted_by = user_name
-                amount += obj.amount + obj.penalty
-                obj.save()
-                count += 1
+            settlement = api_model.Invoice.settle(
+                api_model.Invoice.objects.filter(household_id=pk, is_paid=False),
+                accepted_by=user_name)
             return Response({
                 "message": "payment successful",
-                "amount": amount,
-                "number_of_invoices": count
+                "amount": settlement["paid_amount"],
+                "number_of_invoices": settlement["updated"],
+                "results": settlement["results"]
             })
         else:
             return Response({
@@ -852,25 +968,19 @@ class InvoiceHandleHouseHold(APIView):
             Response: A JSON response indicating the success of the deletion operation,
                       including the total amount cleared and the number of invoices deleted.
         """
-        household = api_model.Household.objects.filter(pk=pk)
-        if household.exists():
-            household = household[0]
-            not_paid_invoice = api_model.Invoice.objects.filter(
-                household=household).filter(is_paid=False)
-            amount = 0
-            count = 0
-            for obj in not_paid_invoice:
-                if not obj.is_paid:
-                    amount += obj.amount + obj.penalty
-                    obj.delete()
-                    count += 1
-            if amount == 0 and count == 0:
+        household = api_model.Household.objects.filter(
+            pk=pk, Association=request.user.association).first()
+        if household:
+            deletion = api_model.Invoice.delete_unpaid(
+                api_model.Invoice.objects.filter(household=household, is_paid=False))
+            if deletion["deleted"] == 0:
                 return Response({
                     "message": "error something went wrong"})
             return Response({
                 "message": f"invoices cleard for {household}",
-                "amount": amount,
-                "number_of_invoices": count
+                "amount": deletion["deleted_amount"],
+                "number_of_invoices": deletion["deleted"],
+                "deleted_ids": deletion["deleted_ids"]
             })
         else:
             return Response({
@@ -878,6 +988,84 @@ class InvoiceHandleHouseHold(APIView):
             })
 
 
+class ReceivablesAgingAPIView(APIView):
+    """
+    API view for the aging report of the association's unpaid invoices.
+
+    Methods:
+        - GET: Retrieve the unpaid amounts per aging bucket, for the whole
+          association and per building.
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Compute the aging report with one grouped query.
+
+        Args:
+            request: The HTTP GET request.
+
+        Returns:
+            Response: A JSON response with the association totals and the
+                      per-building breakdown of each bucket.
+        """
+        rows = api_model.Invoice.objects.filter(
+            household__Association=request.user.association).aging()
+
+        empty = {"invoice_count": 0, "amount": 0, "penalty": 0}
+        totals = {bucket: dict(empty) for bucket, _ in api_model.Invoice.AGING_BUCKETS}
+        buildings = {}
+        for row in rows:
+            building = buildings.setdefault(row['household__building_no'], {
+                bucket: dict(empty) for bucket, _ in api_model.Invoice.AGING_BUCKETS})
+            for key in empty:
+                building[row['bucket']][key] = row[key]
+                totals[row['bucket']][key] += row[key]
+
+        return Response({
+            "as_of": date.today(),
+            "buckets": totals,
+            "buildings": [{"building_no": building_no, "buckets": buckets}
+                          for building_no, buckets in buildings.items()],
+        })
+
+
+class ReceivablesAgingHistoryAPIView(APIView):
+    """
+    API view for the aging trend, read from the daily snapshots.
+
+    Methods:
+        - GET: Retrieve the association totals of each bucket per snapshot date,
+          optionally limited with `from-date` and `to-date` (YYYY-MM-DD).
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        snapshots = api_model.ReceivablesAgingSnapshot.objects.filter(
+            association=request.user.association)
+        try:
+            if request.GET.get("from-date"):
+                snapshots = snapshots.filter(snapshot_date__gte=datetime.strptime(
+                    request.GET.get("from-date"), "%Y-%m-%d").date())
+            if request.GET.get("to-date"):
+                snapshots = snapshots.filter(snapshot_date__lte=datetime.strptime(
+                    request.GET.get("to-date"), "%Y-%m-%d").date())
+        except ValueError:
+            return Response({"error": "Invalid date format. Use 'YYYY-MM-DD'."}, status=400)
+
+        history = (snapshots.values('snapshot_date', 'bucket')
+                   .annotate(invoice_count=Sum('invoice_count'),
+                             amount=Sum('amount'), penalty=Sum('penalty'))
+                   .order_by('snapshot_date', 'bucket'))
+        return Response({"data": list(history)})
+
+
 # * -------------------------------------------------------------------------------------------------
 # * ---------------------------------- FinancialTransaction  Views ----------------------------------
 # * -------------------------------------------------------------------------------------------------
@@ -887,9 +1075,10 @@ class FinancialTransactionListCreateAPIView(
         api_mixins.GetOnlySameAssociateData,
         generics.ListCreateAPIView):
 
-    queryset = api_model.FinancialTransaction.objects.all()
+    queryset = api_model.FinancialTransaction.objects.select_related('association')
     serializer_class = api_serializers.FinancialTransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = api_pagination.FinancialTransactionPagination
     look_up_field = "association"
 
     def list(self, request, *args, **kwargs):
@@ -917,12 +1106,14 @@ class FinancialTransactionListCreateAPIView(
             except ValueError:
                 return Response({"error": "Invalid 'to-date' format. Use 'YYYY-MM-DD'."}, status=400)
 
-        return Response({
-            "amount": qs.count(),
-            "data": api_serializers.FinancialTransactionSerializer(qs, many=True).data
-        })
-
-        return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(qs)
+        data = {
+            "next": self.paginator.get_next_link(),
+            "data": api_serializers.FinancialTransactionSerializer(page, many=True).data
+        }
+        if self.paginator.is_first_page():
+            data["amount"] = qs.count()
+        return Response(data)
 
     def create(self, request, *args, **kwargs):
         # Retrieve the 'Association' from the request or another logic
@@ -947,13 +1138,133 @@ class FinancialTransactionListCreateAPIView(
         serializer = self.get_serializer(data=data, context={
             'financial_summary': financial_summary})
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        try:
+            self.perform_create(serializer)
+        except ValueError as error:
+            # Another expense used the balance since it was validated
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Return the created financial transaction response
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
+class Echo:
+    """A file-like object that hands back what is written, for streaming `csv`."""
+
+    def write(self, value):
+        return value
+
+
+class FinancialTransactionExportAPIView(APIView):
+    """
+    API view for exporting the financial transactions of the user's association.
+
+    Rows are read with `iterator()` in chunks of `chunk_size` over the
+    `(association, date)` index and written to the response as they arrive,
+    so memory use does not depend on the size of the date range.
+
+    Methods:
+        - GET: Stream the transactions, optionally limited with `type`,
+          `from-date` and `to-date` (YYYY-MM-DD, inclusive). `output` selects
+          `csv` (default) or `ndjson`.
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+        chunk_size: Number of rows fetched from the database at a time.
+    """
+    permission_classes = [IsAuthenticated]
+    chunk_size = 2000
+    columns = ['id', 'type', 'amount', 'reason', 'date', 'accessed_by']
+
+    def get(self, request, *args, **kwargs):
+        association = request.user.association
+        output = request.GET.get("output", "csv")
+        if output not in ("csv", "ndjson"):
+            return Response({"error": "'output' must be 'csv' or 'ndjson'."}, status=400)
+
+        qs = api_model.FinancialTransaction.objects.filter(association=association)
+        if request.GET.get("type"):
+            qs = qs.filter(type=request.GET.get("type"))
+        try:
+            if request.GET.get("from-date"):
+                qs = qs.filter(date__gte=api_model.BalanceCheckpoint.start_of(
+                    datetime.strptime(request.GET.get("from-date"), "%Y-%m-%d").date()))
+            if request.GET.get("to-date"):
+                qs = qs.filter(date__lt=api_model.BalanceCheckpoint.start_of(
+                    datetime.strptime(request.GET.get("to-date"), "%Y-%m-%d").date()
+                    + timedelta(days=1)))
+        except ValueError:
+            return Response({"error": "Invalid date format. Use 'YYYY-MM-DD'."}, status=400)
+
+        rows = qs.order_by('date', 'id').values_list(*self.columns).iterator(
+            chunk_size=self.chunk_size)
+        if output == "csv":
+            content, content_type = self.csv_lines(rows, association), "text/csv"
+        else:
+            content, content_type = self.ndjson_lines(rows, association), "application/x-ndjson"
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="transactions-{association.pk}.{output}"')
+        return response
+
+    def csv_lines(self, rows, association):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns + ['association', 'association_name'])
+        for row in rows:
+            yield writer.writerow(
+                list(row[:4]) + [row[4].isoformat(), row[5], association.pk, association.place])
+
+    def ndjson_lines(self, rows, association):
+        for row in rows:
+            record = dict(zip(self.columns, row))
+            record.update(amount=str(record['amount']), date=record['date'].isoformat(),
+                          association=association.pk, association_name=association.place)
+            yield json.dumps(record) + "\n"
+
+
+class FinancialTransactionImportAPIView(APIView):
+    """
+    API view for importing a bank statement as financial transactions.
+
+    Every line is validated before anything is written. Lines that were
+    already imported are skipped, the rest are inserted together and the
+    balance moves once by their net amount.
+
+    Methods:
+        - POST: Import the uploaded `file` (CSV or OFX).
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "No statement file was uploaded."}, status=400)
+        try:
+            content = upload.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            return Response({"error": "The statement must be UTF-8 text."}, status=400)
+
+        rows, errors = parse_statement(content)
+        if errors:
+            return Response({"error": "The statement has invalid lines.",
+                             "lines": errors}, status=400)
+
+        user = request.user
+        try:
+            summary = api_model.FinancialTransaction.import_statement(
+                user.association, rows,
+                accessed_by=f"{user.first_name} {user.last_name}")
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+        return Response({"custom_message": f"{summary['imported']} transactions imported",
+                         "summary": summary}, status=status.HTTP_201_CREATED)
+
+
 class FinancialTransactionUpdate(APIView):
     def put(self, request, *args, **kwargs):
         if request.data.get("id"):
@@ -966,20 +1277,17 @@ class FinancialTransactionUpdate(APIView):
             print(finTxn.association, request.user.association)
             if finTxn and finTxn.association == request.user.association:
                 # ! check the use is in that association first
-                financial_summary = api_model.FinancialSummary.objects.filter(
-                    Association=finTxn.association).first()
+                # save() posts the reversal of the old values to the ledger
                 if request.data.get("type") and request.data.get("amount"):
-                    if finTxn.type == 'income':
-                        financial_summary.deduct_expense(finTxn.amount)
-                    elif finTxn.type == 'expense':
-                        financial_summary.add_income(finTxn.amount)
-
                     finTxn.amount = request.data.get("amount")
                     finTxn.type = request.data.get("type")
-                    finTxn.save()
+                    try:
+                        finTxn.save()
+                    except ValueError as error:
+                        return Response({"error": str(error)}, status=400)
                 elif request.data.get("reason"):
                     finTxn.reason = request.data.get("reason")
-                    finTxn.save(created_i=False)
+                    finTxn.save()
                 else:
                     return Response({"error": "Appropriate Infos are missing"}, status=400)
 
@@ -1000,9 +1308,10 @@ class EventListCreateAPIView(
         api_mixins.GetOnlySameAssociateData,
         generics.ListCreateAPIView):
 
-    queryset = api_model.Event.objects.all()
+    queryset = api_model.Event.objects.select_related('association')
     serializer_class = api_serializers.EventSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = api_pagination.EventPagination
     look_up_field = "association"
 
     def list(self, request, *args, **kwargs):
@@ -1025,10 +1334,10 @@ class EventListCreateAPIView(
                 qs = qs.filter(date__lte=to_date)
             except ValueError:
                 return Response({"error": "Invalid 'to-date' format. Use 'YYYY-MM-DD'."}, status=400)
-        print(qs)
-        seralizer = self.get_serializer(qs, many=True).data
+        page = self.paginate_queryset(qs)
+        seralizer = self.get_serializer(page, many=True).data
 
-        return Response({"data": seralizer})
+        return Response({"next": self.paginator.get_next_link(), "data": seralizer})
 
     def create(self, request, *args, **kwargs):
         association_id = request.data.get('association')
@@ -1047,14 +1356,15 @@ class EventListCreateAPIView(
         # ! retrive the user and check if the user is in the association
         # ! grab the user from the logged in user and get the name of the user
         # ! retrive the association from the user
-        event = api_model.Event.objects.create(
-            association=user_association,
-            name=request.data.get('name'),
-            date=request.data.get('date'),
-            created_by=user_name,
-            penalty_price=request.data.get('penalty_price'),
-        )
-        event.create_attendance_records()
+        with transaction.atomic():
+            event = api_model.Event.objects.create(
+                association=user_association,
+                name=request.data.get('name'),
+                date=request.data.get('date'),
+                created_by=user_name,
+                penalty_price=request.data.get('penalty_price'),
+            )
+            event.create_attendance_records()
         seralizer = api_serializers.EventSerializer(event).data
         return Response({"data": seralizer})
 
@@ -1070,7 +1380,8 @@ class EventRetrieveDestroyAPIView(
 
     def retrieve(self, request, *args, **kwargs):
         obj = self.get_object()
-        eve_att = api_model.EventAttendance.objects.filter(event=obj)
+        # Old events are read from the archive
+        eve_att = obj.attendance_sheet().select_related('household')
         attended = api_serializers.EventAttendanceSerializer(
             eve_att.filter(attended=True), many=True).data
         absent = api_serializers.EventAttendanceSerializer(
@@ -1085,64 +1396,287 @@ class EventRetrieveDestroyAPIView(
         return super().delete(request, *args, **kwargs)
 
 
+class EventCloseAPIView(APIView):
+    """
+    API view for closing an event.
+
+    Methods:
+        - POST: Calculate the attendance penalties of the event and invoice
+          them. Closing an event a second time changes nothing.
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk, *args, **kwargs):
+        event = api_model.Event.objects.filter(
+            pk=pk, association=request.user.association).select_related('association').first()
+        if not event:
+            return Response({"error": "Event not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        user = request.user
+        summary = event.close(created_by=f"{user.first_name} {user.last_name}")
+        if not summary["closed"]:
+            return Response({"custom_message": "The event was already closed",
+                             "summary": summary})
+        return Response({"custom_message": f"{summary['count']} penalty invoices issued",
+                         "summary": summary}, status=status.HTTP_201_CREATED)
+
+
+class ParticipationStatsAPIView(APIView):
+    """
+    API view for ranking the households of the user's association by their
+    participation in the closed events of a year.
+
+    Reads the stats kept up to date by `Event.close`, so the whole ranking is
+    one query over one row per household.
+
+    Methods:
+        - GET: Retrieve the ranking of `year` (the current year by default),
+          ordered by `order`: "attendance" (default), "lateness" or "penalty".
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            year = int(request.GET.get("year") or localdate().year)
+        except ValueError:
+            return Response({"error": "Invalid year."}, status=400)
+        try:
+            stats = api_model.ParticipationStats.ranking(
+                request.user.association, year, request.GET.get("order") or "attendance")
+        except ValueError as error:
+            return Response({"error": str(error)}, status=400)
+
+        rows = stats.values(
+            'rank', 'household_id', 'household__head_of_household',
+            'household__building_no', 'household__apartment_number',
+            'event_count', 'attended_count', 'attendance_rate',
+            'average_late_minutes', 'late_minutes', 'penalty_total')
+        return Response({"year": year, "data": list(rows)})
+
+
 # * -------------------------------------------------------------------------------------------------
 # * ---------------------------------- EventAttendance Views ----------------------------------
 # * -------------------------------------------------------------------------------------------------
 
 class EventAttendanceUpdateAPIView(APIView):
+    """
+    API view for checking households in and out of an event.
+
+    Methods:
+        - PUT: With `type` "start" check the `event_att_ids` in, with "end"
+          check them out; either way with one UPDATE scoped to the event.
+          `event_stat` "end" also records the end time of the event.
+          Responds with the changed records and the attendance counts only,
+          so the cost does not grow with the size of the sheet.
+
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+    """
+    permission_classes = [IsAuthenticated]
 
     def put(self, request, *args, **kwargs):
         type = request.data.get("type")
         event_id = request.data.get("event_id")
         event_stat = request.data.get("event_stat")
+        event_att_ids = request.data.get("event_att_ids") or []
 
-        event = api_model.Event.objects.filter(id=event_id).first()
+        event = api_model.Event.objects.filter(
+            id=event_id, association=request.user.association).select_related('association').first()
         if not event:
             return Response({"error": "Event not found"}, status=400)
+
+        # Only the first start and the first end are recorded
+        started = localtime(now()).time()
         if type == "start" and not event.start_time:
-            if not event.start_time:
-                event.start_time = datetime.now()
-                event.save()
-
-        print(" 1 " * 8)
-        if event_stat == "end":
-            if not event.end_time:
-                event.end_time = datetime.now()
-                event.save()
-        event_att_ids = request.data.get("event_att_ids")
+            event.start_time = started
+            event.save(update_fields=["start_time"])
+        if event_stat == "end" and not event.end_time:
+            event.end_time = started
+            event.save(update_fields=["end_time"])
+
+        changed = []
         if type == "start":
+            changed = event.check_in(event_att_ids)
+        elif type == "end":
+            changed = event.check_out(event_att_ids)
+
+        # Only the records this scan changed, a repeated scan has none
+        records = api_model.EventAttendance.objects.filter(
+            pk__in=changed).select_related('household')
+        data = {
+            "event": api_serializers.EventSerializer(event).data,
+            "changed": len(changed),
+            "records": api_serializers.EventAttendanceSerializer(records, many=True).data,
+            "counts": event.attendance_counts(),
+        }
+        if changed:
+            # The open live screens get the same rows, without reading them again
+            message = {"type": "check_in" if type == "start" else "check_out",
+                       "event": data["event"], "records": data["records"],
+                       "counts": data["counts"]}
+            transaction.on_commit(lambda: api_live.broker.publish(event.pk, message))
+        return Response(data)
 
-            for id in event_att_ids:
-                obj = api_model.EventAttendance.objects.filter(id=id).first()
-                if obj:
-                    obj.entry_time = datetime.now()
 
-                    if obj.exit_time:
-                        obj.exit_time = None
-                    obj.save()
+class EventAttendanceSyncAPIView(APIView):
+    """
+    API view for syncing the scans a gate device queued while offline.
 
-        elif type == "end":
-            for id in event_att_ids:
-                obj = api_model.EventAttendance.objects.filter(
-                    id=id).first()
-                if obj:
-                    print(obj)
-                    if not obj.exit_time:
-                        obj.exit_time = datetime.now()
-                    if obj.entry_time:
-                        obj.attended = True
-                    obj.save()
-
-        eve_att = api_model.EventAttendance.objects.filter(event=event)
+    Scans are applied in the order sent, in one transaction, with the times
+    the device stamped on them. Every scan carries an idempotency `key`, so a
+    batch retried after a lost response is applied once.
 
-        attended = api_serializers.EventAttendanceSerializer(
-            eve_att.filter(attended=True), many=True).data
-        absent = api_serializers.EventAttendanceSerializer(
-            eve_att.filter(attended=False), many=True).data
-        event = api_model.Event.objects.filter(id=event_id).first()
-        seralizer = api_serializers.EventSerializer(event).data
+    Methods:
+        - POST: Apply `scans` to event `event_id`. Each scan has `key`,
+          `type` ("check_in" or "check_out"), `attendance_id` and `at` (an
+          ISO 8601 datetime). Every scan is checked before anything is
+          written. Responds with the sync summary, the changed records and
+          the attendance counts.
 
-        return Response({"event": seralizer, "attended": attended, "absent": absent})
+    Attributes:
+        permission_classes: List of permissions required for this API view.
+        max_scans: The largest batch accepted in one request.
+    """
+    permission_classes = [IsAuthenticated]
+    max_scans = 5000
+
+    def post(self, request, *args, **kwargs):
+        event = api_model.Event.objects.filter(
+            id=request.data.get("event_id"),
+            association=request.user.association).select_related('association').first()
+        if not event:
+            return Response({"error": "Event not found"}, status=400)
+
+        payload = request.data.get("scans")
+        if not isinstance(payload, list) or not payload:
+            return Response({"error": "No scans were sent."}, status=400)
+        if len(payload) > self.max_scans:
+            return Response({"error": f"Send at most {self.max_scans} scans at once."}, status=400)
+
+        scans, errors = [], []
+        for index, raw in enumerate(payload):
+            try:
+                scans.append(self.clean_scan(raw))
+            except ValueError as error:
+                errors.append({"index": index, "error": str(error)})
+        if errors:
+            return Response({"error": "The batch has invalid scans.", "scans": errors}, status=400)
+
+        summary = event.sync_scans(scans)
+        records = api_model.EventAttendance.objects.filter(
+            pk__in=summary["attendance_ids"]).select_related('household')
+        data = {
+            "event": api_serializers.EventSerializer(event).data,
+            "summary": summary,
+            "records": api_serializers.EventAttendanceSerializer(records, many=True).data,
+            "counts": event.attendance_counts(),
+        }
+        if summary["attendance_ids"]:
+            message = {"type": "sync", "event": data["event"],
+                       "records": data["records"], "counts": data["counts"]}
+            transaction.on_commit(lambda: api_live.broker.publish(event.pk, message))
+        return Response(data)
+
+    @staticmethod
+    def clean_scan(raw):
+        if not isinstance(raw, dict):
+            raise ValueError("A scan must be an object.")
+        key = str(raw.get("key") or "").strip()
+        if not key or len(key) > 100:
+            raise ValueError("Key is required and may have at most 100 characters.")
+        if raw.get("type") not in ("check_in", "check_out"):
+            raise ValueError("Type must be 'check_in' or 'check_out'.")
+        try:
+            attendance_id = int(raw.get("attendance_id"))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid attendance_id.")
+        at = parse_datetime(str(raw.get("at") or ""))
+        if at is None:
+            raise ValueError("Invalid time. Use an ISO 8601 datetime.")
+        if is_naive(at):
+            at = make_aware(at)
+        return {"key": key, "type": raw["type"], "attendance_id": attendance_id, "at": at}
+
+
+def authenticate_stream(request):
+    """
+    Return the user of a live stream request, or None.
+
+    `EventSource` cannot set headers, so besides the `Authorization` header
+    the access token may be passed in the `token` query parameter.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get("token")
+    if not raw_token:
+        return None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def event_live_snapshot(user, pk):
+    """Serialize the whole attendance sheet of event `pk`, or None if the user can't see it."""
+    event = api_model.Event.objects.filter(
+        pk=pk, association_id=user.association_id).select_related('association').first()
+    if not event:
+        return None
+    records = api_model.EventAttendance.objects.filter(
+        event=event).select_related('household').order_by('id')
+    return {
+        "event": api_serializers.EventSerializer(event).data,
+        "records": api_serializers.EventAttendanceSerializer(records, many=True).data,
+        "counts": event.attendance_counts(),
+    }
+
+
+async def event_live_stream(request, pk):
+    """
+    Server-sent event stream of the attendance of a running event.
+
+    Sends a `snapshot` of the whole sheet once, then the `check_in` and
+    `check_out` deltas published by `EventAttendanceUpdateAPIView` and the
+    `sync` deltas of `EventAttendanceSyncAPIView` from in-process state, so
+    open screens don't read the sheet again. An
+    `overflow` event means the screen fell behind and should reconnect.
+    Must be served over ASGI (`CMS/asgi.py`).
+    """
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+    # Subscribe first so no change made while the snapshot is read is lost
+    queue = api_live.broker.subscribe(pk)
+    snapshot = await sync_to_async(event_live_snapshot)(user, pk)
+    if snapshot is None:
+        api_live.broker.unsubscribe(pk, queue)
+        return JsonResponse({"error": "Event not found"}, status=404)
+
+    async def stream():
+        try:
+            yield api_live.server_sent_event("snapshot", snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=api_live.KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield api_live.server_sent_event(message["type"], message)
+                if message["type"] == "overflow":
+                    return
+        finally:
+            api_live.broker.unsubscribe(pk, queue)
+
+    return StreamingHttpResponse(stream(), content_type="text/event-stream", headers={
+        "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # * -------------------------------------------------------------------------------------------------
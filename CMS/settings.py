@@ -95,9 +95,14 @@ SIMPLE_JWT = {
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
 }
 
+# Default and upper bound for the `page_size` query parameter of the
+# paginated list views
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -142,6 +147,28 @@ DATABASES = {
 }
 
 
+# Cache
+# Cached values are dropped when the data they come from changes, so every
+# worker must see the same cache: the database one is shared by all of them
+# (its table is created by migration 0031). Redis or Memcached also work.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cms_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Seconds a household invoice statement stays cached, it is also dropped
+# whenever one of the household's invoices changes
+HOUSEHOLD_STATEMENT_CACHE_TIMEOUT = 60 * 60
+
+# Days after which the attendance sheet of a closed event is moved out of the
+# live table into the archive by `manage.py archive_events`
+EVENT_ARCHIVE_AFTER_DAYS = 180
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 